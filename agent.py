@@ -1,51 +1,157 @@
 import torch
 import random
 import numpy as np
-from collections import deque
-from model import Linear_QNet, QTrainer
-from plot import plot
+from model import Linear_QNet, QTrainer, InferencePolicy
+from memory import ReplayBuffer, PrioritizedReplayBuffer, NStepBuilder
+from features import FeatureExtractor
+from checkpoint import save_checkpoint, load_checkpoint, latest_checkpoint
+from plot import Plotter
+from profiler import Profiler
 from game import Game
+from episode_log import EpisodeRecorder
+from opponents import make_opponent
 
 # Maximum memory size
 MAX_MEMORY = 100_000
 BATCH_SIZE = 1000
 LEARNING_RATE = 0.001
+HIDDEN_SIZE = 256
+
+# Exploration: chance of a random move is (EPSILON_START - EPSILON_DECAY * n_games) / 200
+EPSILON_START = 80
+EPSILON_DECAY = 1
+
+# Model input (see features.py): ball and paddle velocities, ball x, opponent paddle, and how many frames to stack
+FEATURE_VELOCITY = False
+FEATURE_BALL_X = False
+FEATURE_OPPONENT = False
+FRAME_STACK = 1
+
+# Discount rate for the bootstrapped part of the target
+GAMMA = 0.9
+
+# Rewards summed over N_STEP frames before bootstrapping (1 is plain one-step Q-learning)
+N_STEP = 3
+
+# Target network: hard sync every TARGET_UPDATE train steps, or Polyak averaging with rate TAU when set
+TARGET_UPDATE = 1000
+TAU = None
+DOUBLE_DQN = True
+
+# Learning schedule: an update every TRAIN_EVERY frames made of GRADIENT_STEPS optimizer steps, none
+# until WARMUP_STEPS frames are in memory. SHORT_BATCH_SIZE=None trains on the frame's own transition,
+# a number samples a minibatch of that size from memory instead. A long-memory update still runs after every game
+TRAIN_EVERY = 1
+GRADIENT_STEPS = 1
+WARMUP_STEPS = 0
+SHORT_BATCH_SIZE = None
+
+# Sample long-memory batches by TD error (sum-tree prioritized replay) instead of uniformly
+PRIORITIZED_REPLAY = False
+
+# Directory for a memory-mapped replay buffer that survives restarts, None keeps it in RAM
+MEMORY_PATH = None
+
+# Save a full checkpoint every N games, keeping the last KEEP_CHECKPOINTS
+CHECKPOINT_EVERY = 50
+KEEP_CHECKPOINTS = 3
+
+# Per-stage timers and counters, summarized to ./logs/profile.jsonl
+PROFILE = True
+
+# Draw the game every N frames while training, 0 trains headless
+RENDER_EVERY = 0
+
+# Right paddle while training (see opponents.py): 'tracker', 'self', a model/checkpoint file, or None for the keyboard
+OPPONENT = 'tracker'
 
 class Agent:
-    def __init__(self):
+    def __init__(
+            self,
+            memory_path=MEMORY_PATH,
+            inference_mode=None,
+            batch_size=BATCH_SIZE,
+            seed=None,
+            lr=LEARNING_RATE,
+            hidden_size=HIDDEN_SIZE,
+            max_memory=MAX_MEMORY,
+            epsilon_start=EPSILON_START,
+            epsilon_decay=EPSILON_DECAY,
+    ):
         self.n_games = 0
+        self.batch_size = batch_size
 
         # Randomness
         self.epsilon = 0
+        self.epsilon_start = epsilon_start
+        self.epsilon_decay = epsilon_decay
+        self.rng = random.Random(seed)
 
         # Discount rate
-        self.gamma = 0
-        self.memory = deque(maxlen=MAX_MEMORY)
+        self.gamma = GAMMA
+
+        # States are views into the extractor's ring of buffers; one per frame in the n-step window,
+        # plus the newest next_state and one spare, keeps every state alive until memory copies it
+        self.features = FeatureExtractor(
+            velocity=FEATURE_VELOCITY,
+            ball_x=FEATURE_BALL_X,
+            opponent=FEATURE_OPPONENT,
+            stack=FRAME_STACK,
+            buffers=N_STEP + 2,
+        )
+        state_size = self.features.size
+
+        # Agent and self-play opponent states, predicted together
+        self.state_pair = np.zeros((2, state_size), dtype=np.float32)
+
+        if PRIORITIZED_REPLAY:
+            self.memory = PrioritizedReplayBuffer(max_memory, state_size=state_size, path=memory_path)
+        else:
+            self.memory = ReplayBuffer(max_memory, state_size=state_size, path=memory_path)
+        self.memory.rng = np.random.default_rng(seed)
+
+        # Turns single frames into n-step transitions on their way into memory
+        self.n_step = NStepBuilder(N_STEP, self.gamma)
 
         # TODO: model, trainer
-        self.model = Linear_QNet(3,256,3)
-        self.trainer = QTrainer(self.model, lr=LEARNING_RATE, gamma=self.gamma)
+        self.model = Linear_QNet(state_size,hidden_size,3)
+        self.trainer = QTrainer(
+            self.model,
+            lr=lr,
+            gamma=self.gamma ** N_STEP,
+            target_update=TARGET_UPDATE,
+            tau=TAU,
+            double=DOUBLE_DQN,
+        )
 
-    def get_state(self,game):
-        # States being tracked: y-coord of paddle, y-coord of pong, and difference between them
-        state = [
-            game.left_paddle.y,
-            game.pong.y,
-            abs(game.pong.y-game.left_paddle.y),
-        ]
+        # Decisions use the live model, or a 'script'/'quantized' copy refreshed with policy.sync()
+        self.policy = InferencePolicy(self.model, mode=inference_mode)
 
-        return np.array(state, dtype=int)
+    def get_state(self,game):
+        # States being tracked: y-coord of paddle, y-coord of pong, and difference between them (plus the
+        # optional features), normalized float32. Call once per frame: each call pushes a frame onto the stack
+        return self.features.extract(game)
 
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done)) # popleft
+        # Store the n-step transitions this frame completes (none while the window fills, all of it on done)
+        transitions = self.n_step.push(state, action, reward, next_state, done)
+        for transition in transitions:
+            self.memory.push(*transition) # overwrites oldest when full
+        return transitions
 
-    def train_long_memory(self):
-        if len(self.memory) > BATCH_SIZE:
-            mini_sample = random.sample(self.memory, BATCH_SIZE) # list of tuples
-        else:
-            mini_sample = self.memory
+    def train_long_memory(self, batch_size=None):
+        if batch_size is None:
+            batch_size = self.batch_size
+
+        if isinstance(self.memory, PrioritizedReplayBuffer):
+            # Batch drawn by priority, weighted to undo the sampling bias, then reprioritized by its TD errors
+            states, actions, rewards, next_states, dones, weights, indices = self.memory.sample(batch_size)
+            td_errors = self.trainer.train_step(states, actions, rewards, next_states, dones, weights)
+            self.memory.update_priorities(indices, td_errors)
+            return
 
-        states, actions, rewards, next_states, dones = zip(*mini_sample)
+        # Random batch (or whole memory if smaller) as ready-to-use tensors
+        states, actions, rewards, next_states, dones = self.memory.sample(batch_size)
         self.trainer.train_step(states, actions, rewards, next_states, dones)
 
         # for state, action, reward, next_state, done in mini_sample:
@@ -56,59 +162,190 @@ class Agent:
         
 
     # Random moves: tradeoff exploration / exploitation
-    def get_action(self, state):
+    # Returns an action index (UP, DOWN, STOP). With opponent_state (self-play), also returns the
+    # greedy move for the mirrored paddle from the same forward pass
+    def get_action(self, state, opponent_state=None):
 
         # Epsilon shrinks as number of games grow
-        self.epsilon = 80 - self.n_games
-        final_move = [0,0,0]
+        self.epsilon = self.epsilon_start - self.epsilon_decay * self.n_games
+
+        if opponent_state is not None:
+            self.state_pair[0] = state
+            self.state_pair[1] = opponent_state
+            predicted, opponent_move = self.policy.predict(self.state_pair)
 
         # Random option
-        if random.randint(0,200) < self.epsilon:
+        if self.rng.randint(0,200) < self.epsilon:
             # Random select move: [up, down, stop]
-            move = random.randint(0,2)
-            final_move[move] = 1
+            move = self.rng.randint(0,2)
 
         # Predict movement
         else:
-            state0 = torch.tensor(state, dtype=torch.float) # Tensor e.g., [5.0, 2.4, 2.4]
-            prediction = self.model(state0) # Pass tensor to Linear_QNet model
-            
-            move = torch.argmax(prediction).item() # Recieve the index of the largest value in the prediction
-            final_move[move] = 1 # Pass index into action
+            if opponent_state is None:
+                predicted = self.policy.predict(state) # Index of the largest predicted Q value, computed without autograd
+            move = int(predicted)
+
+        if opponent_state is not None:
+            return move, int(opponent_move)
+        return move
+
+class TrainSchedule:
+    # Decides when the training loop learns, separately from how often it collects frames
+    def __init__(
+            self,
+            train_every=TRAIN_EVERY,
+            gradient_steps=GRADIENT_STEPS,
+            warmup_steps=WARMUP_STEPS,
+            short_batch_size=SHORT_BATCH_SIZE,
+    ):
+        self.train_every = train_every
+        self.gradient_steps = gradient_steps
+        self.warmup_steps = warmup_steps
+        self.short_batch_size = short_batch_size
 
-        return final_move
+        # Frames collected and optimizer steps taken so far
+        self.env_steps = 0
+        self.updates = 0
 
-def train():
+    def _warm(self):
+        return self.env_steps > self.warmup_steps
+
+    # Called once per frame with the transitions agent.remember just stored; returns the optimizer steps taken
+    def step(self, agent, transitions):
+        self.env_steps += 1
+        if not self._warm() or self.env_steps % self.train_every:
+            return 0
+
+        # Nothing new to learn from while the n-step window fills, or not a full batch in memory yet
+        if self.short_batch_size is None and not transitions:
+            return 0
+        if self.short_batch_size is not None and len(agent.memory) < self.short_batch_size:
+            return 0
+
+        for _ in range(self.gradient_steps):
+            if self.short_batch_size is None:
+                agent.train_short_memory(*zip(*transitions))
+            else:
+                agent.train_long_memory(self.short_batch_size)
+
+        self.updates += self.gradient_steps
+        return self.gradient_steps
+
+    # Called at the end of every game
+    def end_episode(self, agent):
+        # A game shorter than the n-step window may leave memory empty
+        if not self._warm() or not len(agent.memory):
+            return 0
+
+        agent.train_long_memory()
+        self.updates += 1
+        return 1
+
+
+def train(
+        render_every=RENDER_EVERY,
+        resume=False,
+        profile_episodes=0,
+        torch_profile=False,
+        seed=None,
+        record_path=None,
+        max_games=None,
+        should_stop=None,
+        plot=True,
+        agent_kwargs=None,
+        opponent=OPPONENT,
+):
+    # Runs until max_games games (forever when None), or until should_stop(n_games, score, mean_score) is true.
+    # agent_kwargs override Agent hyperparameters (lr, hidden_size, batch_size, ...), opponent picks the right paddle
     plot_scores = []
     plot_mean_scores = []
     total_score = 0
     record = 0
 
-    agent = Agent()
-    game = Game()
+    # profile_episodes > 0 also captures cProfile (and torch.profiler) over that many games
+    profiler = Profiler(enabled=PROFILE, profile_episodes=profile_episodes, torch_profile=torch_profile)
+
+    # A seed fixes model init, exploration, replay sampling and every game's ball
+    if seed is not None:
+        torch.manual_seed(seed)
+
+    agent = Agent(seed=seed, **(agent_kwargs or {}))
+    game = Game(render_every=render_every, profiler=profiler, seed=seed)
+
+    # When to learn, in env steps
+    schedule = TrainSchedule()
+
+    # Who plays the right paddle
+    opponent = make_opponent(opponent, agent, seed)
 
-    while True:
-        # Get previous state
-        state_old = agent.get_state(game)
+    # Pick up weights, optimizer, counters, histories and RNG states from the latest checkpoint
+    if resume:
+        file_name = latest_checkpoint()
+        if file_name is not None:
+            stats = load_checkpoint(agent, file_name, game, opponent)
+            game.reset()
+            plot_scores = stats['plot_scores']
+            plot_mean_scores = stats['plot_mean_scores']
+            total_score = stats['total_score']
+            record = stats['record']
+            schedule.env_steps = stats.get('env_steps', 0)
+            schedule.updates = stats.get('updates', 0)
+            print('Resumed from', file_name, 'at game', agent.n_games)
+
+    # Plots are drawn by a background process, rate limited to PLOT_INTERVAL
+    plotter = Plotter(plot_scores, plot_mean_scores) if plot else None
+
+    # Log each episode's seed, actions and rewards so it can be replayed exactly with episode_log.py
+    recorder = None
+    if record_path is not None:
+        recorder = EpisodeRecorder(record_path)
+        recorder.begin(game.episode_seed)
 
-        # Get move based on previous state
-        final_move = agent.get_action(state_old)
+    # The new state of each frame is the old state of the next one
+    state_old = agent.get_state(game)
+    stopped_early = False
+
+    while max_games is None or agent.n_games < max_games:
+        # Get move based on previous state (and the opponent's, batched with it in self-play)
+        with profiler.timer('get_action'):
+            opponent_move = None
+            if opponent is not None and opponent.self_play:
+                final_move, opponent_move = agent.get_action(state_old, opponent.get_state(game))
+            else:
+                final_move = agent.get_action(state_old)
+                if opponent is not None:
+                    opponent_move = opponent.act(game)
 
         # Preform move and get new state
-        reward, done, score = game.play_step(final_move)
-        state_new = agent.get_state(game)
+        with profiler.timer('play_step'):
+            reward, done, score = game.play_step(final_move, opponent_move)
+        with profiler.timer('get_state'):
+            state_new = agent.get_state(game)
+        profiler.count('frames')
 
-        # Train short memory
-        agent.train_short_memory(state_old, final_move, reward, state_new, done)
+        if recorder is not None:
+            recorder.record(final_move, reward, opponent_move)
 
         # Remember progress
-        agent.remember(state_old, final_move, reward, state_new, done)
+        with profiler.timer('remember'):
+            transitions = agent.remember(state_old, final_move, reward, state_new, done)
+
+        # Train short memory, as often as the schedule says
+        with profiler.timer('train_short_memory'):
+            profiler.count('updates', schedule.step(agent, transitions))
+        state_old = state_new
 
         if done:
             # Train long memory
+            if recorder is not None:
+                recorder.end()
             game.reset()
+            state_old = agent.get_state(game)
+            if recorder is not None:
+                recorder.begin(game.episode_seed)
             agent.n_games += 1
-            agent.train_long_memory()
+            with profiler.timer('train_long_memory'):
+                profiler.count('updates', schedule.end_episode(agent))
 
             # Save new record
             if score > record:
@@ -122,8 +359,60 @@ def train():
             total_score += score
             mean_score = total_score / agent.n_games
             plot_mean_scores.append(mean_score)
-            plot(plot_scores, plot_mean_scores)
+            if plotter is not None:
+                plotter.update(score, mean_score)
+
+            if agent.n_games % CHECKPOINT_EVERY == 0:
+                with profiler.timer('checkpoint'):
+                    save_checkpoint(agent, {
+                        'plot_scores': plot_scores,
+                        'plot_mean_scores': plot_mean_scores,
+                        'total_score': total_score,
+                        'record': record,
+                        'env_steps': schedule.env_steps,
+                        'updates': schedule.updates,
+                    }, keep=KEEP_CHECKPOINTS, game=game, opponent=opponent)
+
+            profiler.end_episode()
+
+            if should_stop is not None and should_stop(agent.n_games, score, mean_score):
+                stopped_early = True
+                break
+
+    if plotter is not None:
+        plotter.close()
+    if recorder is not None:
+        recorder.close()
+
+    return {
+        'games': agent.n_games,
+        'mean_score': total_score / max(agent.n_games, 1),
+        'record': record,
+        'env_steps': schedule.env_steps,
+        'updates': schedule.updates,
+        'stopped_early': stopped_early,
+    }
 
 
 if __name__ == "__main__":
-    train()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--resume', action='store_true', help='continue from the latest checkpoint')
+    parser.add_argument('--profile', type=int, default=0, metavar='N', help='capture cProfile over the first N games')
+    parser.add_argument('--torch-profile', action='store_true', help='also capture torch.profiler with --profile')
+    parser.add_argument('--seed', type=int, default=None, help='make the run reproducible')
+    parser.add_argument('--record', default=None, metavar='PATH', help='append every episode to this log for episode_log.py')
+    parser.add_argument('--games', type=int, default=None, help='stop after this many games')
+    parser.add_argument('--opponent', default=OPPONENT, help="right paddle: 'tracker', 'self', 'none' (keyboard) or a model file")
+    args = parser.parse_args()
+
+    train(
+        resume=args.resume,
+        profile_episodes=args.profile,
+        torch_profile=args.torch_profile,
+        seed=args.seed,
+        record_path=args.record,
+        max_games=args.games,
+        opponent=args.opponent,
+    )
\ No newline at end of file
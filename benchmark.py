@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import random
+import platform
+import numpy as np
+import torch
+
+# Draw to an offscreen surface when there is no display, so rendering can still be timed
+if sys.platform.startswith('linux') and not os.environ.get('DISPLAY'):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from agent import Agent
+from game import Game
+
+"""
+Fixed, seeded workloads for the training loop:
+    - game_step_headless: Game.play_step without rendering
+    - game_step_render: Game.play_step drawing every frame
+    - get_state_action: Agent.get_state + Agent.get_action (greedy, so the model runs every call)
+    - train_short_memory: one single-transition update
+    - train_long_memory_<n>: one update on a batch of n transitions
+
+Each reports calls/sec and p50/p99/mean latency in microseconds.
+"""
+
+SEED = 0
+LONG_BATCH_SIZES = [32, 256, 1000]
+
+
+def _seed(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def _measure(call, iterations, warmup):
+    for _ in range(warmup):
+        call()
+
+    latencies = np.empty(iterations)
+    clock = time.perf_counter_ns
+    for i in range(iterations):
+        start = clock()
+        call()
+        latencies[i] = clock() - start
+
+    latencies /= 1000
+    return {
+        'iterations': iterations,
+        'calls_per_sec': iterations / (latencies.sum() / 1e6),
+        'p50_us': float(np.percentile(latencies, 50)),
+        'p99_us': float(np.percentile(latencies, 99)),
+        'mean_us': float(latencies.mean()),
+    }
+
+
+def bench_game_step(render_every, iterations):
+    _seed(SEED)
+    game = Game(render_every=render_every, max_fps=None, seed=SEED) # every frame drawn, no frame cap
+    rng = np.random.default_rng(SEED)
+    actions = rng.integers(0, 3, iterations * 2)
+    step = iter(actions)
+
+    def call():
+        reward, done, score = game.play_step(int(next(step)))
+        if done:
+            game.reset()
+
+    return _measure(call, iterations, warmup=iterations // 10)
+
+
+def bench_get_state_action(iterations):
+    _seed(SEED)
+    agent = Agent(seed=SEED)
+    game = Game(render_every=0, seed=SEED)
+
+    # Past the epsilon schedule, every call goes through the model
+    agent.n_games = 1000
+
+    def call():
+        agent.get_action(agent.get_state(game))
+
+    return _measure(call, iterations, warmup=iterations // 10)
+
+
+def _random_transition(rng):
+    state = rng.integers(0, 600, 3)
+    next_state = rng.integers(0, 600, 3)
+    return state, int(rng.integers(3)), float(rng.choice([0, 10, -10])), next_state, bool(rng.random() < 0.05)
+
+
+def bench_train_short_memory(iterations):
+    _seed(SEED)
+    agent = Agent(seed=SEED)
+    rng = np.random.default_rng(SEED)
+    transitions = [_random_transition(rng) for _ in range(100)]
+    step = iter(range(iterations * 2))
+
+    def call():
+        agent.train_short_memory(*transitions[next(step) % len(transitions)])
+
+    return _measure(call, iterations, warmup=iterations // 10)
+
+
+def bench_train_long_memory(batch_size, iterations):
+    _seed(SEED)
+    agent = Agent(batch_size=batch_size, seed=SEED)
+    rng = np.random.default_rng(SEED)
+    for _ in range(max(batch_size * 10, 10_000)):
+        agent.remember(*_random_transition(rng))
+
+    return _measure(agent.train_long_memory, iterations, warmup=max(iterations // 10, 1))
+
+
+def run(scale=1.0):
+    steps = max(int(20_000 * scale), 10)
+    updates = max(int(200 * scale), 2)
+
+    results = {
+        'game_step_headless': bench_game_step(0, steps),
+        'game_step_render': bench_game_step(1, max(steps // 10, 10)),
+        'get_state_action': bench_get_state_action(steps // 4),
+        'train_short_memory': bench_train_short_memory(steps // 4),
+    }
+    for batch_size in LONG_BATCH_SIZES:
+        results[f'train_long_memory_{batch_size}'] = bench_train_long_memory(batch_size, updates)
+
+    return {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'torch': torch.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'torch_threads': torch.get_num_threads(),
+            'seed': SEED,
+            'scale': scale,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold):
+    # Workloads whose throughput fell more than threshold (a fraction) below the baseline
+    regressions = []
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            continue
+
+        ratio = result['calls_per_sec'] / baseline['results'][name]['calls_per_sec']
+        print(f'{name:28s} {ratio:6.2f}x baseline')
+        if ratio < 1 - threshold:
+            regressions.append(name)
+
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default='benchmark.json', help='where to write the JSON results')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the number of iterations')
+    parser.add_argument('--compare', default=None, help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed throughput drop vs the baseline')
+    args = parser.parse_args()
+
+    results = run(args.scale)
+
+    print(f'{"workload":28s} {"calls/s":>12s} {"p50 us":>10s} {"p99 us":>10s}')
+    for name, result in results['results'].items():
+        print(f'{name:28s} {result["calls_per_sec"]:12.1f} {result["p50_us"]:10.1f} {result["p99_us"]:10.1f}')
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('Regressions:', ', '.join(regressions))
+            sys.exit(1)
@@ -0,0 +1,100 @@
+import os
+import glob
+import random
+import tempfile
+import numpy as np
+import torch
+
+# Where training checkpoints are rotated
+CHECKPOINT_FOLDER = './model/checkpoints'
+
+
+def _checkpoint_files(folder):
+    # Zero-padded game counts keep the names in chronological order
+    return sorted(glob.glob(os.path.join(folder, 'checkpoint_*.pth')))
+
+
+def save_checkpoint(agent, stats, folder=CHECKPOINT_FOLDER, keep=3, game=None, opponent=None):
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    # Make sure a memory-mapped replay buffer on disk matches the checkpoint
+    agent.memory.flush()
+
+    checkpoint = {
+        'model': agent.model.state_dict(),
+        'optimizer': agent.trainer.optimizer.state_dict(),
+        'target_model': agent.trainer.target_model.state_dict() if agent.trainer.target_model is not None else None,
+        'trainer_steps': agent.trainer.steps,
+        'n_games': agent.n_games,
+        'stats': stats,
+        'rng': {
+            'random': random.getstate(),
+            'numpy': np.random.get_state(),
+            'torch': torch.get_rng_state(),
+            'memory': agent.memory.rng.bit_generator.state,
+            'agent': agent.rng.getstate(),
+            'game': game.seed_rng.getstate() if game is not None else None,
+            # Only scripted opponents (TrackingOpponent) draw random numbers
+            'opponent': opponent.rng.getstate() if getattr(opponent, 'rng', None) is not None else None,
+        },
+    }
+
+    # Write to a temp file in the same folder, then rename so a crash never leaves a partial checkpoint
+    file_name = os.path.join(folder, f'checkpoint_{agent.n_games:08d}.pth')
+    fd, tmp_name = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            torch.save(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, file_name)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+    # Rotate out the oldest checkpoints
+    for old_file in _checkpoint_files(folder)[:-keep]:
+        os.remove(old_file)
+
+    return file_name
+
+
+def latest_checkpoint(folder=CHECKPOINT_FOLDER):
+    files = _checkpoint_files(folder)
+    return files[-1] if files else None
+
+
+def load_model_weights(file_name):
+    # Model state_dict from a plain Linear_QNet.save file or a full checkpoint
+    state_dict = torch.load(file_name, weights_only=False)
+    if 'model' in state_dict:
+        state_dict = state_dict['model']
+    return state_dict
+
+
+def load_checkpoint(agent, file_name, game=None, opponent=None):
+    # Our own file: it holds RNG states that weights_only loading rejects
+    checkpoint = torch.load(file_name, weights_only=False)
+
+    agent.model.load_state_dict(checkpoint['model'])
+    agent.trainer.optimizer.load_state_dict(checkpoint['optimizer'])
+    agent.trainer.steps = checkpoint['trainer_steps']
+    if agent.trainer.target_model is not None:
+        # Checkpoints from runs without a target network start it from the model
+        agent.trainer.target_model.load_state_dict(checkpoint['target_model'] or checkpoint['model'])
+    agent.n_games = checkpoint['n_games']
+
+    rng = checkpoint['rng']
+    random.setstate(rng['random'])
+    np.random.set_state(rng['numpy'])
+    torch.set_rng_state(rng['torch'])
+    agent.memory.rng.bit_generator.state = rng['memory']
+    agent.rng.setstate(rng['agent'])
+    if game is not None and rng['game'] is not None:
+        game.seed_rng.setstate(rng['game'])
+    # Checkpoints from before opponents were saved have no 'opponent' entry
+    if getattr(opponent, 'rng', None) is not None and rng.get('opponent') is not None:
+        opponent.rng.setstate(rng['opponent'])
+
+    return checkpoint['stats']
@@ -0,0 +1,205 @@
+import queue
+import random
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from agent import Agent, HIDDEN_SIZE, OPPONENT, CHECKPOINT_EVERY, KEEP_CHECKPOINTS
+from checkpoint import save_checkpoint
+from game import Game
+from model import Linear_QNet
+from opponents import make_opponent
+from plot import Plotter
+
+"""
+Actor/learner training:
+    - Actors: worker processes playing headless games with a synced copy of the model
+    - Learner: owns the replay memory and trainer, publishes new weights back to the actors
+
+Actor -> learner messages:
+    - ('transitions', states, actions, rewards, next_states, dones)
+    - ('episode', score)
+"""
+
+# Number of actor processes
+N_WORKERS = 4
+
+# Transitions an actor collects before sending them to the learner
+CHUNK_SIZE = 256
+
+# Gradient steps the learner runs for every chunk it receives
+UPDATES_PER_CHUNK = 1
+
+# Publish the learner's weights to the actors every N gradient steps
+PUBLISH_EVERY = 10
+
+# Actor inference (see model.InferencePolicy). Eager: re-scripting on every weight refresh costs ~8ms,
+# more than the ~10us per predict it saves over the ~640 frames an actor plays between refreshes
+ACTOR_INFERENCE_MODE = None
+
+# Chunks waiting in the queue before actors block
+QUEUE_SIZE = 64
+
+
+def actor(worker_id, shared_model, weights_version, weights_lock, n_games, transitions, stop, seed, opponent):
+    # One core per actor, the learner owns the rest
+    torch.set_num_threads(1)
+    random.seed(seed + worker_id)
+    np.random.seed(seed + worker_id)
+    torch.manual_seed(seed + worker_id)
+
+    agent = Agent(inference_mode=ACTOR_INFERENCE_MODE, seed=seed + worker_id)
+    game = Game(render_every=0, seed=seed + worker_id)
+    opponent = make_opponent(opponent, agent, seed + worker_id)
+    local_version = -1
+
+    # Local chunk of transitions, sent as whole arrays
+    state_size = agent.features.size
+    states = np.zeros((CHUNK_SIZE, state_size), dtype=np.float32)
+    actions = np.zeros(CHUNK_SIZE, dtype=np.uint8)
+    rewards = np.zeros(CHUNK_SIZE, dtype=np.float32)
+    next_states = np.zeros((CHUNK_SIZE, state_size), dtype=np.float32)
+    dones = np.zeros(CHUNK_SIZE, dtype=bool)
+    count = 0
+
+    state_old = agent.get_state(game)
+    while not stop.is_set():
+        # Pull new weights when the learner has published them
+        if weights_version.value != local_version:
+            with weights_lock:
+                agent.model.load_state_dict(shared_model.state_dict())
+                local_version = weights_version.value
+            agent.policy.sync()
+
+        # Epsilon follows the total number of games played by all actors
+        agent.n_games = n_games.value
+
+        opponent_move = None
+        if opponent is not None and opponent.self_play:
+            final_move, opponent_move = agent.get_action(state_old, opponent.get_state(game))
+        else:
+            final_move = agent.get_action(state_old)
+            if opponent is not None:
+                opponent_move = opponent.act(game)
+        reward, done, score = game.play_step(final_move, opponent_move)
+        state_new = agent.get_state(game)
+
+        # Same n-step transitions as Agent.remember would store
+        for transition in agent.n_step.push(state_old, final_move, reward, state_new, done):
+            states[count], actions[count], rewards[count], next_states[count], dones[count] = transition
+            count += 1
+
+            if count == CHUNK_SIZE:
+                transitions.put(('transitions', states.copy(), actions.copy(), rewards.copy(), next_states.copy(), dones.copy()))
+                count = 0
+        state_old = state_new
+
+        if done:
+            game.reset()
+            state_old = agent.get_state(game)
+            transitions.put(('episode', score))
+
+
+def train_distributed(n_workers=N_WORKERS, seed=0, max_games=None, opponent=OPPONENT):
+    ctx = mp.get_context('spawn')
+
+    # The learner trains agent.model and copies it into shared memory for the actors
+    agent = Agent()
+    shared_model = Linear_QNet(agent.features.size,HIDDEN_SIZE,3)
+    shared_model.load_state_dict(agent.model.state_dict())
+    shared_model.share_memory()
+
+    weights_version = ctx.Value('i', 0)
+    weights_lock = ctx.Lock()
+    n_games = ctx.Value('i', 0)
+    transitions = ctx.Queue(maxsize=QUEUE_SIZE)
+    stop = ctx.Event()
+
+    workers = [
+        ctx.Process(
+            target=actor,
+            args=(worker_id, shared_model, weights_version, weights_lock, n_games, transitions, stop, seed, opponent),
+            daemon=True,
+        )
+        for worker_id in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    plot_scores = []
+    plot_mean_scores = []
+    total_score = 0
+    record = 0
+    updates = 0
+    plotter = Plotter()
+
+    try:
+        while max_games is None or agent.n_games < max_games:
+            try:
+                message = transitions.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            if message[0] == 'transitions':
+                agent.memory.push_batch(*message[1:])
+
+                for _ in range(UPDATES_PER_CHUNK):
+                    agent.train_long_memory()
+                    updates += 1
+
+                    if updates % PUBLISH_EVERY == 0:
+                        with weights_lock:
+                            shared_model.load_state_dict(agent.model.state_dict())
+                            weights_version.value += 1
+
+            elif message[0] == 'episode':
+                score = message[1]
+                agent.n_games += 1
+                n_games.value = agent.n_games
+
+                # Save new record
+                if score > record:
+                    record = score
+                    agent.model.save()
+
+                print('Game: ', agent.n_games, 'Score: ', score, 'Record: ', record)
+
+                plot_scores.append(score)
+                total_score += score
+                mean_score = total_score / agent.n_games
+                plot_mean_scores.append(mean_score)
+                plotter.update(score, mean_score)
+
+                if agent.n_games % CHECKPOINT_EVERY == 0:
+                    save_checkpoint(agent, {
+                        'plot_scores': plot_scores,
+                        'plot_mean_scores': plot_mean_scores,
+                        'total_score': total_score,
+                        'record': record,
+                    }, keep=KEEP_CHECKPOINTS)
+    finally:
+        stop.set()
+        plotter.close()
+
+        # Unblock actors waiting on a full queue so they can exit
+        while any(worker.is_alive() for worker in workers):
+            try:
+                transitions.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        for worker in workers:
+            worker.join()
+
+    return plot_scores
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=N_WORKERS, help='number of actor processes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--games', type=int, default=None, help='stop after this many games')
+    parser.add_argument('--opponent', default=OPPONENT, help="right paddle: 'tracker', 'self', 'none' or a model file")
+    args = parser.parse_args()
+
+    train_distributed(n_workers=args.workers, seed=args.seed, max_games=args.games, opponent=args.opponent)
@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+import struct
+import numpy as np
+from game import action_index
+
+"""
+Compact binary log of whole episodes, enough to re-simulate them exactly:
+    - header: magic b'PONG', episode seed (uint32), number of frames (uint32)
+    - actions: one uint8 per frame, bits 0-1 the agent's move (0: UP, 1: DOWN, 2: STOP),
+      bits 2-3 the opponent's move plus one (0 when the right paddle had no opponent)
+    - rewards: one int8 per frame
+
+Episodes are appended back to back, 2 bytes per frame.
+"""
+
+MAGIC = b'PONG'
+HEADER = struct.Struct('<4sII')
+
+
+class EpisodeRecorder:
+    def __init__(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.file = open(path, 'ab')
+
+        self.seed = None
+        self.actions = bytearray()
+        self.rewards = bytearray()
+
+    def begin(self, seed):
+        self.seed = seed
+        self.actions.clear()
+        self.rewards.clear()
+
+    def record(self, action, reward, opponent_action=None):
+        # Accept one-hot or index actions
+        packed = action_index(action)
+        if opponent_action is not None:
+            packed |= (action_index(opponent_action) + 1) << 2
+        self.actions.append(packed)
+        self.rewards.append(reward & 0xff)
+
+
+    # Write the finished episode in one go
+    def end(self):
+        self.file.write(HEADER.pack(MAGIC, self.seed, len(self.actions)))
+        self.file.write(self.actions)
+        self.file.write(self.rewards)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_episodes(path):
+    # Yields (seed, actions, rewards) for every episode in the log
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    offset = 0
+    while offset < len(data):
+        magic, seed, frames = HEADER.unpack_from(data, offset)
+        if magic != MAGIC:
+            raise ValueError(f'{path}: bad episode header at byte {offset}')
+
+        offset += HEADER.size
+        actions = np.frombuffer(data, dtype=np.uint8, count=frames, offset=offset)
+        rewards = np.frombuffer(data, dtype=np.int8, count=frames, offset=offset + frames)
+        offset += 2 * frames
+
+        yield seed, actions, rewards
+
+
+def replay(seed, actions):
+    # Re-simulate an episode headless, returning the reward of every frame
+    from game import Game
+
+    game = Game(render_every=0)
+    game.reset(seed=seed)
+
+    rewards = np.zeros(len(actions), dtype=np.int8)
+    for frame, action in enumerate(actions):
+        opponent_action = int(action >> 2)
+        reward, done, score = game.play_step(int(action & 3), opponent_action - 1 if opponent_action else None)
+        rewards[frame] = reward
+        if done:
+            return rewards[:frame + 1]
+
+    return rewards
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Re-simulate recorded episodes and check they match the log')
+    parser.add_argument('path', help='episode log written by agent.py --record')
+    parser.add_argument('--episode', type=int, default=None, help='only replay this episode (0-based)')
+    args = parser.parse_args()
+
+    mismatches = 0
+    total_frames = 0
+    start = time.perf_counter()
+
+    for idx, (seed, actions, rewards) in enumerate(read_episodes(args.path)):
+        if args.episode is not None and idx != args.episode:
+            continue
+
+        replayed = replay(seed, actions)
+        total_frames += len(actions)
+
+        if not np.array_equal(replayed, rewards):
+            mismatches += 1
+            print(f'Episode {idx} (seed {seed}): replay diverged')
+        elif args.episode is not None:
+            print(f'Episode {idx} (seed {seed}): {len(actions)} frames, score {int((rewards == 10).sum())}')
+
+    elapsed = time.perf_counter() - start
+    print(f'Replayed {total_frames} frames in {elapsed:.2f}s ({total_frames / max(elapsed, 1e-9):.0f} frames/s), {mismatches} mismatches')
+    sys.exit(1 if mismatches else 0)
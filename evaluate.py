@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import numpy as np
+import torch
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+Greedy, headless evaluation of saved models:
+    python evaluate.py model/model.pth model/checkpoints/checkpoint_00000500.pth --episodes 100
+
+Every model plays the same seeded games against the same opponent (see opponents.py, a tracker
+seeded per episode by default), so scores are directly comparable.
+Accepts plain state_dict files (Linear_QNet.save) and full training checkpoints.
+"""
+
+EPISODES = 100
+
+# Episodes are cut off here, a model that never misses would otherwise play forever
+MAX_FRAMES = 10_000
+
+# Right paddle: 'tracker', 'self', 'none' or a model/checkpoint file, as in agent.py
+OPPONENT = 'tracker'
+
+# Per-worker caches of loaded agents, keyed by model path, and snapshot opponents, keyed by file
+_agents = {}
+_opponents = {}
+
+
+def _init_worker():
+    # Parallelism comes from the pool, one thread per worker
+    torch.set_num_threads(1)
+
+
+def _load_agent(path):
+    if path not in _agents:
+        from agent import Agent
+        from checkpoint import load_model_weights
+
+        state_dict = load_model_weights(path)
+
+        # Models from sweeps may use a different hidden size
+        agent = Agent(hidden_size=state_dict['linear1.weight'].shape[0])
+
+        # The input size depends on the feature settings in agent.py
+        if state_dict['linear1.weight'].shape[1] != agent.features.size:
+            raise ValueError(
+                f'{path} takes {state_dict["linear1.weight"].shape[1]} features, '
+                f'agent.py is set up for {agent.features.size}'
+            )
+        agent.model.load_state_dict(state_dict)
+        agent.model.eval()
+        _agents[path] = agent
+
+    return _agents[path]
+
+
+def _make_opponent(spec, agent, seed):
+    from opponents import make_opponent
+
+    # Trackers are seeded per episode; snapshots are only loaded once per worker
+    if spec in (None, 'none', 'tracker', 'self'):
+        return make_opponent(spec, agent, seed)
+
+    if spec not in _opponents:
+        _opponents[spec] = make_opponent(spec, agent, seed)
+    return _opponents[spec]
+
+
+def play_episode(path, seed, max_frames=MAX_FRAMES, opponent=OPPONENT):
+    # One greedy episode (no exploration); returns score and number of frames
+    from game import Game
+
+    agent = _load_agent(path)
+    opponent = _make_opponent(opponent, agent, seed)
+    game = Game(render_every=0, seed=seed)
+
+    while game.frame_iteration < max_frames:
+        move = agent.model.predict(agent.get_state(game))
+        opponent_move = opponent.act(game) if opponent is not None else None
+        reward, done, score = game.play_step(move, opponent_move)
+        if done:
+            break
+
+    return game.ai_score, game.frame_iteration
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'p5': float(np.percentile(values, 5)),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+    }
+
+
+def evaluate(paths, episodes=EPISODES, seed=0, workers=None, max_frames=MAX_FRAMES, opponent=OPPONENT):
+    workers = workers or os.cpu_count()
+    seeds = list(range(seed, seed + episodes))
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'), initializer=_init_worker) as pool:
+        futures = {
+            path: [pool.submit(play_episode, path, episode_seed, max_frames, opponent) for episode_seed in seeds]
+            for path in paths
+        }
+
+        for path, path_futures in futures.items():
+            scores, lengths = zip(*(future.result() for future in path_futures))
+            results[path] = {
+                'episodes': episodes,
+                'score': _summary(scores),
+                'length': _summary(lengths),
+                'truncated': int(sum(length >= max_frames for length in lengths)),
+            }
+
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('models', nargs='+', help='model or checkpoint files to evaluate')
+    parser.add_argument('--episodes', type=int, default=EPISODES)
+    parser.add_argument('--seed', type=int, default=0, help='first game seed, episodes use seed, seed+1, ...')
+    parser.add_argument('--workers', type=int, default=None, help='processes in the pool (default: all cores)')
+    parser.add_argument('--max-frames', type=int, default=MAX_FRAMES, help='cut episodes off after this many frames')
+    parser.add_argument('--opponent', default=OPPONENT, help="right paddle: 'tracker', 'self', 'none' or a model file")
+    parser.add_argument('--json', default=None, help='also write the results to this file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = evaluate(args.models, args.episodes, args.seed, args.workers, args.max_frames, args.opponent)
+    elapsed = time.perf_counter() - start
+
+    print(f'{"model":50s} {"score":>14s} {"p5/p50/p95":>16s} {"length":>10s} {"cut off":>8s}')
+    for path, result in results.items():
+        score, length = result['score'], result['length']
+        print(
+            f'{path:50s} {score["mean"]:7.2f} ± {score["std"]:4.2f}'
+            f' {score["p5"]:5.1f}/{score["p50"]:4.1f}/{score["p95"]:4.1f}'
+            f' {length["mean"]:10.0f} {result["truncated"]:8d}'
+        )
+    print(f'{len(args.models) * args.episodes} episodes in {elapsed:.1f}s')
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
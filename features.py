@@ -0,0 +1,154 @@
+import numpy as np
+
+"""
+Turns game state into the model's input: normalized float32 features written into
+preallocated buffers, for a single game.Game or a batched vector_env.VectorPongEnv.
+
+Features per frame, in this order:
+    - left_paddle.y, pong.y and abs(pong.y-left_paddle.y), divided by the window height
+    - velocity=True: pong.vel_x, pong.vel_y and left_paddle.vel, divided by the paddle speed
+    - ball_x=True: pong.x, divided by the window width
+    - opponent=True: right_paddle.y, divided by the window height
+
+With stack=k the last k frames are concatenated, oldest first. The first frame of an
+episode fills the whole stack.
+
+With mirror=True the same features are taken from the right paddle's side of the court
+(paddles swapped, x axis flipped), so one model can play either paddle.
+"""
+
+# Same layout as game.Game
+WINDOW_WIDTH = 1000
+WINDOW_HEIGHT = 600
+PADDLE_SPEED = 8
+
+
+class FeatureExtractor:
+    def __init__(self, velocity=False, ball_x=False, opponent=False, stack=1, n_games=None, buffers=2, mirror=False):
+        self.velocity = velocity
+        self.ball_x = ball_x
+        self.opponent = opponent
+        self.stack = stack
+        self.n_games = n_games
+        self.mirror = mirror
+
+        # Model input size
+        self.frame_size = 3 + 3 * velocity + ball_x + opponent
+        self.size = self.frame_size * stack
+
+        # Each call writes the next buffer in the ring and returns it, so the last `buffers` states
+        # stay valid (e.g. while they wait in an n-step window); callers keeping them longer must copy
+        if n_games is None:
+            self.buffers = np.zeros((buffers, self.size), dtype=np.float32)
+        else:
+            self.buffers = np.zeros((buffers, n_games, self.size), dtype=np.float32)
+        self.current = 0
+
+        # Games whose next frame starts a new stack
+        self.fresh = np.ones(n_games or 1, dtype=bool)
+
+    # Same features for the other paddle, e.g. for an opponent model
+    def mirrored(self, buffers=2):
+        return FeatureExtractor(
+            self.velocity, self.ball_x, self.opponent, self.stack, self.n_games, buffers, not self.mirror,
+        )
+
+    # Start new stacks on the next call, for every game or those selected by a boolean mask
+    def reset(self, mask=None):
+        if mask is None:
+            self.fresh[:] = True
+        else:
+            self.fresh[mask] = True
+
+    def _frame(self, paddle_y, ball_y, ball_x, vel_x, vel_y, paddle_vel, opponent_y):
+        # Works on scalars and arrays alike, so both paths share one layout
+        if self.mirror:
+            ball_x, vel_x = WINDOW_WIDTH - ball_x, -vel_x
+
+        features = [
+            paddle_y / WINDOW_HEIGHT,
+            ball_y / WINDOW_HEIGHT,
+            abs(ball_y - paddle_y) / WINDOW_HEIGHT,
+        ]
+        if self.velocity:
+            features += [vel_x / PADDLE_SPEED, vel_y / PADDLE_SPEED, paddle_vel / PADDLE_SPEED]
+        if self.ball_x:
+            features.append(ball_x / WINDOW_WIDTH)
+        if self.opponent:
+            features.append(opponent_y / WINDOW_HEIGHT)
+        return features
+
+    def _next_buffer(self):
+        previous = self.buffers[self.current]
+        self.current = (self.current + 1) % len(self.buffers)
+        return previous, self.buffers[self.current]
+
+    def extract(self, game):
+        # Features of one game.Game, shape (size,)
+        if game.frame_iteration == 0:
+            self.fresh[0] = True
+
+        own, other = game.left_paddle, game.right_paddle
+        if self.mirror:
+            own, other = other, own
+
+        previous, out = self._next_buffer()
+        out[-self.frame_size:] = self._frame(
+            own.y, game.pong.y, game.pong.x,
+            game.pong.vel_x, game.pong.vel_y, own.vel,
+            other.y,
+        )
+
+        if self.stack > 1:
+            if self.fresh[0]:
+                out[:-self.frame_size] = np.tile(out[-self.frame_size:], self.stack - 1)
+            else:
+                out[:-self.frame_size] = previous[self.frame_size:]
+        self.fresh[0] = False
+
+        return out
+
+    def extract_batch(self, env):
+        # Features of every game in a vector_env.VectorPongEnv, shape (n_games, size)
+        own_y, own_vel, other_y = env.left_paddle_y, env.left_paddle_vel, env.right_paddle_y
+        if self.mirror:
+            own_y, own_vel, other_y = env.right_paddle_y, env.right_paddle_vel, env.left_paddle_y
+
+        previous, out = self._next_buffer()
+        frame = self._frame(
+            own_y, env.ball_y, env.ball_x,
+            env.vel_x, env.vel_y, own_vel,
+            other_y,
+        )
+        for column, values in enumerate(frame, start=self.size - self.frame_size):
+            out[:, column] = values
+
+        if self.stack > 1:
+            fresh = self.fresh
+            out[~fresh, :-self.frame_size] = previous[~fresh, self.frame_size:]
+            if fresh.any():
+                out[fresh, :-self.frame_size] = np.tile(out[fresh, -self.frame_size:], self.stack - 1)
+        self.fresh[:] = False
+
+        return out
+
+    def refresh(self, env, mask):
+        # Rewrite the masked games' rows of the last extract_batch result in place, from their
+        # current state, e.g. games that were reset after the batch was taken. Starts new stacks
+        out = self.buffers[self.current]
+        own_y, own_vel, other_y = env.left_paddle_y, env.left_paddle_vel, env.right_paddle_y
+        if self.mirror:
+            own_y, own_vel, other_y = env.right_paddle_y, env.right_paddle_vel, env.left_paddle_y
+
+        frame = self._frame(
+            own_y[mask], env.ball_y[mask], env.ball_x[mask],
+            env.vel_x[mask], env.vel_y[mask], own_vel[mask],
+            other_y[mask],
+        )
+        rows = np.empty((len(frame[0]), self.frame_size), dtype=np.float32)
+        for column, values in enumerate(frame):
+            rows[:, column] = values
+        out[mask] = np.tile(rows, self.stack)
+        self.fresh[mask] = False
+
+        return out
@@ -1,12 +1,25 @@
-import pygame
-from pygame.locals import *
+import os
 import random
+import math
 from enum import Enum
 import numpy as np
+from profiler import Profiler
+from renderer import MAX_FPS
 
-# Initialize module
-pygame.init()
-font = pygame.font.Font(None, 32)
+# Imported and initialized by _init_pygame on the first rendered game, headless games never load it
+pygame = None
+
+
+def _init_pygame():
+    global pygame
+    if pygame is None:
+        # Keep SIGINT/SIGTERM as Python signals: SDL would turn them into QUIT events, which headless games never poll
+        os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+
+        import pygame as module
+        module.init()
+        pygame = module
+    return pygame
 
 """
 Information for training model
@@ -24,9 +37,10 @@ Rewards:
     - Ball passes your paddle: -10
 
 Actions:
-    - UP: [1,0,0]
-    - DOWN: [0,1,0]
-    - STOP: [0,0,1]
+    - UP: 0
+    - DOWN: 1
+    - STOP: 2
+    (one-hot lists [1,0,0], [0,1,0], [0,0,1] are still accepted)
 
 States: 
     - [pong.y, left_paddle.y, abs(ball.y-left_paddle.y)]
@@ -60,27 +74,61 @@ Loss function: loss = (Qnew - Q)^2
 #     UP = 1
 #     DOWN = 2
 
+# Action indices, as used by the agent, replay memory and VectorPongEnv
+UP, DOWN, STOP = 0, 1, 2
+
+# One-hot form of each action, for code that still works with [UP, DOWN, STOP] lists
+MOVES = [[1,0,0], [0,1,0], [0,0,1]]
+
+
+def action_index(action):
+    # Integer actions pass through, one-hot lists/arrays are converted
+    if isinstance(action, int):
+        return action
+    if np.ndim(action) == 0:
+        return int(action)
+    return int(np.argmax(action))
+
+
 # RBB colors
 BLUE = (0,0,255)
 WHITE = (255,255,255)
 BLACK = (0,0,0)
 
 class Pong:
-    def __init__(self,parent_window, window_width, window_height):
+    # Fixed layout, no per-instance __dict__; the window is passed to draw() instead of stored
+    __slots__ = ('rng', 'window_width', 'window_height', 'radius', 'x', 'y', 'vel_x', 'vel_y', 'serves')
+
+    # Random serve choices
+    direction = (0,1)
+    angle = (0,1,2)
+
+    def __init__(self, window_width, window_height, rng=random):
+
+        # Source of the ball's random directions, the game's per-episode RNG
+        self.rng = rng
 
         # Display window infromation
-        self.parent_window = parent_window
         self.window_width,self.window_height = window_width, window_height
-
-        # Initial values for ball: radius, x, y
         self.radius = 15
+
+        self.reset()
+
+    def reset(self):
+        # Initial values for ball: x, y
         self.x = self.window_width/2-self.radius
         self.y = self.window_height/2-self.radius
 
         # Velocity (x,y) of ball
-        self.vel_x, self.vel_y = random.choice([-8,8]),random.choice([-8,8])
-        self.direction = [0,1]
-        self.angle = [0,1,2]
+        self.vel_x, self.vel_y = self.rng.choice([-8,8]),self.rng.choice([-8,8])
+
+        # Serves so far; with the episode seed this pins down the RNG state (see Game.restore)
+        self.serves = 0
+
+    # Randomly change the angle of ball: direction and angle for a serve
+    def _draw_serve(self):
+        self.serves += 1
+        return self.rng.choice(self.direction), self.rng.choice(self.angle)
 
     # Keep ball within window dimensions
     def move(self):
@@ -100,8 +148,7 @@ class Pong:
             # self.y = random.randint(self.radius, self.window_height-self.radius)
 
             # Randomly change the angle of ball
-            random_direction = random.choice(self.direction)
-            random_angle = random.choice(self.angle)
+            random_direction, random_angle = self._draw_serve()
 
             if random_direction == 0:
                 if random_angle == 0:
@@ -169,24 +216,29 @@ class Pong:
                 self.vel_x *= -1
 
     # Draw ball
-    def draw(self):
-        pygame.draw.circle(self.parent_window, BLUE, (self.x, self.y), self.radius)
+    # Returns the Rect drawn over, for the renderer's dirty rects
+    def draw(self, window):
+        return pygame.draw.circle(window, BLUE, (self.x, self.y), self.radius)
 
 
 class Paddle:
-    def __init__(self,parent_window, window_width, window_height):
+    __slots__ = ('window_width', 'window_height', 'width', 'height', 'x', 'y', 'vel')
+
+    def __init__(self, window_width, window_height):
 
         # Display window information
-        self.parent_window = parent_window
         self.window_width,self.window_height = window_width, window_height
 
         # Initial values for paddle
         self.width = 20
         self.height = 120
         self.x = 0
+        self.reset()
+
+    # Back to the middle, standing still (x stays on its side)
+    def reset(self):
         self.y = self.window_height/2 - self.height/2
         self.vel = 0
-        
 
     # Set a paddle on the left side
     def set_left_paddle(self):
@@ -215,8 +267,8 @@ class Paddle:
         if self.y <= 0:
             self.y = 0
 
-    def draw(self):
-        pygame.draw.rect(self.parent_window, WHITE, pygame.Rect(self.x, self.y, self.width, self.height))
+    def draw(self, window):
+        return pygame.draw.rect(window, WHITE, pygame.Rect(self.x, self.y, self.width, self.height))
 
     # Return location information for pong to handle paddle/pong collisions
     def get_information(self):
@@ -224,29 +276,61 @@ class Paddle:
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, render_every=1, profiler=None, seed=None, max_fps=MAX_FPS):
 
         # Initial values for display window
         self.width=1000
         self.height=600
-        self.window = pygame.display.set_mode((self.width,self.height))
 
-        # Create title of window
-        pygame.display.set_caption('Ping Pong Game')
+        # Draw every N frames, 0 runs headless (no window, drawing or event polling)
+        self.render_every = render_every
+        self.window = None
+        self.renderer = None
 
-        self.reset()
+        # Per-stage timers, disabled unless a profiler is passed in
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
 
-    def reset(self):
-         # Create paddles
-        self.left_paddle = Paddle(self.window, self.width, self.height)
-        self.right_paddle = Paddle(self.window, self.width, self.height)
+        # Every episode gets its own seed drawn from here, so one seed reproduces a whole run
+        # and an episode seed alone reproduces that episode
+        self.seed_rng = random.Random(seed)
+
+        if self.render_every:
+            _init_pygame()
+            from renderer import Renderer
+
+            self.window = pygame.display.set_mode((self.width,self.height))
+
+            # Create title of window
+            pygame.display.set_caption('Ping Pong Game')
+
+            # Draws at most max_fps frames a second and only what changed
+            self.renderer = Renderer(self.window, max_fps=max_fps)
+
+        # Per-episode RNG, reseeded by reset()
+        self.episode_seed = None
+        self.rng = random.Random()
+
+        # Create paddles and pong once, reset() puts them back in place every episode
+        self.left_paddle = Paddle(self.width, self.height)
+        self.right_paddle = Paddle(self.width, self.height)
 
         # Set initial paddle position
         self.left_paddle.set_left_paddle()
         self.right_paddle.set_right_paddle()
 
         # Create pong
-        self.pong = Pong(self.window, self.width, self.height)
+        self.pong = Pong(self.width, self.height, self.rng)
+
+        self.reset()
+
+    def reset(self, seed=None):
+        # Seed this episode's RNG, drawing a fresh seed unless one is given
+        self.episode_seed = seed if seed is not None else self.seed_rng.getrandbits(32)
+        self.rng.seed(self.episode_seed)
+
+        self.left_paddle.reset()
+        self.right_paddle.reset()
+        self.pong.reset()
 
         # Initialize values for score
         self.ai_score = 0
@@ -256,6 +340,40 @@ class Game:
         # Initialize iteration count
         self.frame_iteration = 0
 
+    # Whole simulation state as a small tuple of numbers, for branching rollouts:
+    #     state = game.snapshot(); ...try something...; game.restore(state)
+    # The RNG is captured as (episode seed, serves) rather than its 2.5KB Mersenne Twister state
+    def snapshot(self):
+        pong, left_paddle, right_paddle = self.pong, self.left_paddle, self.right_paddle
+        return (
+            pong.x, pong.y, pong.vel_x, pong.vel_y,
+            left_paddle.y, left_paddle.vel,
+            right_paddle.y, right_paddle.vel,
+            self.ai_score, self.player_score, self.frame_iteration,
+            self.episode_seed, pong.serves,
+        )
+
+    def restore(self, state):
+        pong, left_paddle, right_paddle = self.pong, self.left_paddle, self.right_paddle
+        (
+            pong.x, pong.y, pong.vel_x, pong.vel_y,
+            left_paddle.y, left_paddle.vel,
+            right_paddle.y, right_paddle.vel,
+            self.ai_score, self.player_score, self.frame_iteration,
+            episode_seed, serves,
+        ) = state
+
+        # Rewind the RNG only if a serve (or another episode) happened since the snapshot:
+        # reseed and repeat the same draws, which leaves it exactly where it was
+        if episode_seed != self.episode_seed or serves != pong.serves:
+            self.episode_seed = episode_seed
+            self.rng.seed(episode_seed)
+            self.rng.choice([-8,8]) # Pong.reset's starting velocity
+            self.rng.choice([-8,8])
+            pong.serves = 0
+            for _ in range(serves):
+                pong._draw_serve()
+
     def handle_movement(self):
         # Grab location information from paddles
         left_paddle_x,left_paddle_y = self.left_paddle.get_information()
@@ -279,38 +397,39 @@ class Game:
         self.pong.move()
 
     def _move(self, action, paddle):
-          # [UP, DOWN, STOP]
-        if np.array_equal(action, [1,0,0]):
+        # UP, DOWN or STOP
+        if not isinstance(action, int):
+            action = action_index(action)
+
+        if action == UP:
             paddle.move_up()
-        elif np.array_equal(action, [0,1,0]):
+        elif action == DOWN:
             paddle.move_down()
         else:
             paddle.stop()
 
     def _update_ui(self):
-        # Refill background to clear previous movement
-        self.window.fill(BLACK)
+        # Frames over the frame rate cap are skipped, the simulation keeps its own pace
+        if not self.renderer.ready():
+            return
 
-        # Draw pong and paddles
-        self.pong.draw()
-        self.left_paddle.draw()
-        self.right_paddle.draw()
-
-        # Display score
-        self.score = font.render(f"Score: [{self.ai_score},{self.player_score}]", True, WHITE, BLACK)
-        self.window.blit(self.score, (20,20))
+        # Display score, only re-rendered when it changes
+        self.renderer.text('score', f"Score: [{self.ai_score},{self.player_score}]", topleft=(20,20))
 
         # Display iteration
-        # self.iteration = font.render(f"Iteration: {self.frame_iteration}", True, WHITE, BLACK)
-        # self.window.blit(self.iteration, (self.width-200, 20))
+        # self.renderer.text('iteration', f"Iteration: {self.frame_iteration}", topleft=(self.width-200, 20))
 
-        # Update display
-        pygame.display.update()            
+        # Redraw pong and paddles where they were and where they are now
+        self.renderer.render([
+            lambda: self.pong.draw(self.window),
+            lambda: self.left_paddle.draw(self.window),
+            lambda: self.right_paddle.draw(self.window),
+        ])
 
-    def play_step(self,action):
-        # Increment frame interation
-        self.frame_iteration += 1
+    def _should_render(self):
+        return self.render_every and self.frame_iteration % self.render_every == 0
 
+    def _handle_events(self):
         # Loop through user actions, i.e., user clicks
         for event in pygame.event.get():
             # End game when player closes window
@@ -331,13 +450,26 @@ class Game:
             if event.type == pygame.KEYUP:
                 self.right_paddle.stop()
 
+    def play_step(self,action,opponent_action=None):
+        # opponent_action moves the right paddle (see opponents.py); None leaves it to the keyboard
+        # Increment frame interation
+        self.frame_iteration += 1
+
+        # Only poll the window on frames that are drawn
+        render = self._should_render()
+        if render:
+            with self.profiler.timer('events'):
+                self._handle_events()
 
         # Functions for pong/paddle movement
-        self.handle_movement()        
+        with self.profiler.timer('physics'):
+            self.handle_movement()
 
         # Move paddles with prediction model
-        self._move(action, self.left_paddle)
-        # self._move(action, self.right_paddle)
+        with self.profiler.timer('action'):
+            self._move(action, self.left_paddle)
+            if opponent_action is not None:
+                self._move(opponent_action, self.right_paddle)
 
         # Initialize value
         reward = 0
@@ -357,15 +489,81 @@ class Game:
         # if self.pong._is_paddle_colision(self.left_paddle):
         #     reward = 5
 
-        self._update_ui()
+        if render:
+            with self.profiler.timer('update_ui'):
+                self._update_ui()
             
         return reward, game_over, self.ai_score
 
+    def _frames_inside(self, position, velocity, low, high):
+        # Number of frames position + k*velocity stays strictly between low and high
+        if velocity > 0:
+            return math.ceil((high - position) / velocity) - 1
+        if velocity < 0:
+            return math.ceil((position - low) / -velocity) - 1
+        return math.inf
+
+    def _quiet_frames(self):
+        # Frames the ball can fly without touching a wall, a paddle's x range or either goal line
+        radius = self.pong.radius
+        paddle_width = self.left_paddle.width
+        left_x, right_x = self.left_paddle.x, self.right_paddle.x
+
+        # Open stretches of court between the goal lines and the paddle planes
+        for low, high in (
+            (radius, left_x),
+            (left_x + paddle_width, right_x),
+            (right_x + paddle_width, self.width - radius),
+        ):
+            if low < self.pong.x < high:
+                break
+        else:
+            return 0
+
+        if not radius < self.pong.y < self.height - radius:
+            return 0
+
+        return min(
+            self._frames_inside(self.pong.x, self.pong.vel_x, low, high),
+            self._frames_inside(self.pong.y, self.pong.vel_y, radius, self.height - radius),
+        )
+
+    def _advance(self, frames):
+        # Closed form of frames quiet play_steps: straight ball flight, paddles moving until clamped
+        self.frame_iteration += frames
+        self.pong.x += frames * self.pong.vel_x
+        self.pong.y += frames * self.pong.vel_y
+
+        for paddle in (self.left_paddle, self.right_paddle):
+            paddle.y = min(max(paddle.y + frames * paddle.vel, 0), self.height - paddle.height)
+
+    def play_steps(self, action, frames, opponent_action=None):
+        # Repeat action (and opponent_action) for up to frames frames, stopping early on a reward or game over
+        # Returns reward, game_over, score and the number of frames played
+        reward, game_over, score = self.play_step(action, opponent_action)
+        played = 1
+
+        # After the first step the paddle already moves with this action, so stretches with no
+        # bounce, paddle contact or goal can be jumped over (headless only, nothing is drawn)
+        while played < frames and not reward and not game_over:
+            skip = 0
+            if not self.render_every:
+                skip = min(self._quiet_frames(), frames - played)
+
+            if skip > 0:
+                self._advance(skip)
+                played += skip
+            else:
+                reward, game_over, score = self.play_step(action, opponent_action)
+                played += 1
+
+        return reward, game_over, score, played
+
 if __name__ == "__main__":
     game = Game()
 
     while True:
-        reward,game_over,score = game.play_step(True)
+        reward,game_over,score = game.play_step(STOP)
         if game_over == True:
             break
     
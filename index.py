@@ -1,5 +1,6 @@
 
 import pygame
+from renderer import Renderer
 
 # Initialize module
 pygame.init()
@@ -16,19 +17,19 @@ BLACK = (0,0,0)
 # Set title
 pygame.display.set_caption('Ping Pong Game')
 
-font = pygame.font.Font(None, 32)
-title = font.render("Ping Pong Game", True, WHITE, BLACK)
-title_container = title.get_rect()
-title_container.center = (window_width/2, 30)
+# Simulation frames per second; the ball and paddle speeds are per frame
+FPS = 60
+clock = pygame.time.Clock()
+
+# Draws only what moved, with titles rendered once per value; the clock already paces every frame
+renderer = Renderer(window, max_fps=None)
+renderer.text('title', "Ping Pong Game", center=(window_width/2, 30))
 
 # Game information
 TOTAL_POINTS = 10
 ai_points = 0
 player_points = 0
 
-# Set text
-print(pygame.font.get_fonts())
-
 # Pong ball information
 ball_radius = 15
 ball_location_x, ball_location_y = window_width/2-ball_radius, window_height/2-ball_radius
@@ -49,25 +50,6 @@ while run:
     if ai_points == TOTAL_POINTS or player_points == TOTAL_POINTS:
         run = False
 
-    # Refill background to clear previous movement
-    window.fill(BLACK)
-
-    # Add titles
-    window.blit(title, title_container)
-
-
-    # Create titles for point totals
-    ai_points_title = font.render("AI: "+str(ai_points), True, WHITE, BLACK)
-    ai_points_title_container = title.get_rect()
-    ai_points_title_container.center = (100, 30)
-
-    player_points_title = font.render("Player: "+str(player_points), True, WHITE, BLACK)
-    player_points_title_container = title.get_rect()
-    player_points_title_container.center = (window_width-20, 30)
-
-    window.blit(ai_points_title, ai_points_title_container)
-    window.blit(player_points_title, player_points_title_container)
-
     # Loop through stored user actions, i.e., user clicks
     for event in pygame.event.get():
         # End game when player closes window
@@ -153,16 +135,16 @@ while run:
 
 
     # Draw pong ball and paddles
-    pygame.draw.circle(window, BLUE, (ball_location_x, ball_location_y), ball_radius)
-    pygame.draw.rect(window, WHITE, pygame.Rect(left_paddle_x, left_paddle_y, paddle_width, paddle_height))
-    pygame.draw.rect(window, WHITE, pygame.Rect(right_paddle_x, right_paddle_y, paddle_width, paddle_height))
-
-    pygame.display.update()
-
-
-
-
-    
-
-
-
+    if renderer.ready():
+        # Titles for point totals, only re-rendered when they change
+        renderer.text('ai_points', "AI: "+str(ai_points), center=(100, 30))
+        renderer.text('player_points', "Player: "+str(player_points), center=(window_width-20, 30))
+
+        renderer.render([
+            lambda: pygame.draw.circle(window, BLUE, (ball_location_x, ball_location_y), ball_radius),
+            lambda: pygame.draw.rect(window, WHITE, pygame.Rect(left_paddle_x, left_paddle_y, paddle_width, paddle_height)),
+            lambda: pygame.draw.rect(window, WHITE, pygame.Rect(right_paddle_x, right_paddle_y, paddle_width, paddle_height)),
+        ])
+
+    # Wait out the rest of the frame
+    clock.tick(FPS)
@@ -0,0 +1,279 @@
+import os
+import numpy as np
+import torch
+from collections import deque
+
+
+class ReplayBuffer:
+    def __init__(self, capacity, state_size, path=None, readonly=False):
+        self.capacity = capacity
+
+        # Directory of memory-mapped .npy files, None keeps everything in RAM
+        self.path = path
+        self.readonly = readonly
+        if self.path is not None and not self.readonly:
+            os.makedirs(self.path, exist_ok=True)
+
+        # Preallocated, contiguous storage for every field of a transition
+        self.states = self._allocate('states', (capacity, state_size), np.float32)
+        self.actions = self._allocate('actions', (capacity,), np.uint8) # action index (UP, DOWN, STOP)
+        self.rewards = self._allocate('rewards', (capacity,), np.float32)
+        self.next_states = self._allocate('next_states', (capacity, state_size), np.float32)
+        self.dones = self._allocate('dones', (capacity,), bool)
+
+        # Next slot to write and number of filled slots, stored alongside the data so a reopened buffer resumes
+        self._meta = self._allocate('meta', (2,), np.int64)
+
+        self.rng = np.random.default_rng()
+
+    def _allocate(self, name, shape, dtype):
+        if self.path is None:
+            return np.zeros(shape, dtype=dtype)
+
+        file_name = os.path.join(self.path, name + '.npy')
+
+        # Reopen existing files in place, nothing is read until it is touched
+        if os.path.exists(file_name):
+            array = np.load(file_name, mmap_mode='r' if self.readonly else 'r+')
+            if array.shape != shape or array.dtype != dtype:
+                raise ValueError(f'{file_name} holds {array.dtype}{array.shape}, expected {np.dtype(dtype)}{shape}')
+            return array
+
+        if self.readonly:
+            raise FileNotFoundError(file_name)
+
+        return np.lib.format.open_memmap(file_name, mode='w+', dtype=dtype, shape=shape)
+
+    # Open an existing buffer from disk, e.g. read-only from another process
+    @classmethod
+    def open(cls, path, readonly=True):
+        states = np.load(os.path.join(path, 'states.npy'), mmap_mode='r')
+        capacity, state_size = states.shape
+        return cls(capacity, state_size, path=path, readonly=readonly)
+
+    @property
+    def position(self):
+        return int(self._meta[0])
+
+    @position.setter
+    def position(self, value):
+        self._meta[0] = value
+
+    @property
+    def size(self):
+        return int(self._meta[1])
+
+    @size.setter
+    def size(self, value):
+        self._meta[1] = value
+
+    def __len__(self):
+        return self.size
+
+    def push(self, state, action, reward, next_state, done):
+        # Overwrite the oldest transition once full, like deque(maxlen=capacity)
+        if self.readonly:
+            raise PermissionError('replay buffer was opened read-only')
+
+        idx = self.position
+        self.states[idx] = state
+        self.actions[idx] = action
+        self.rewards[idx] = reward
+        self.next_states[idx] = next_state
+        self.dones[idx] = done
+
+        # Counters are written last, so a crash mid-push leaves a new slot outside size while filling up;
+        # once full, the slot being overwritten is already in use and can be left half-written
+        self.position = (idx + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        # Same as push for a whole batch of transitions, wrapping around the end of the buffer
+        if self.readonly:
+            raise PermissionError('replay buffer was opened read-only')
+
+        n = len(rewards)
+        idx = (self.position + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    # Push memory-mapped pages to disk, e.g. before a checkpoint
+    def flush(self):
+        if self.path is None or self.readonly:
+            return
+
+        for array in (self.states, self.actions, self.rewards, self.next_states, self.dones, self._meta):
+            array.flush()
+
+    def sample(self, batch_size):
+        # Whole buffer if it is smaller than a batch, otherwise a random batch without replacement
+        if self.size > batch_size:
+            idx = self.rng.choice(self.size, batch_size, replace=False)
+        else:
+            idx = np.arange(self.size)
+
+        return (
+            torch.from_numpy(self.states[idx]),
+            torch.from_numpy(self.actions[idx]),
+            torch.from_numpy(self.rewards[idx]),
+            torch.from_numpy(self.next_states[idx]),
+            torch.from_numpy(self.dones[idx]),
+        )
+
+    # Memory footprint of the storage arrays
+    @property
+    def nbytes(self):
+        return (
+            self.states.nbytes
+            + self.actions.nbytes
+            + self.rewards.nbytes
+            + self.next_states.nbytes
+            + self.dones.nbytes
+        )
+
+    @property
+    def bytes_per_transition(self):
+        return self.nbytes // self.capacity
+
+
+class SumTree:
+    def __init__(self, capacity):
+        # Leaves hold priorities, every inner node the sum of its two children; node 1 is the root
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.tree = np.zeros(2 * self.leaves)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def update_one(self, idx, priority):
+        # Set one leaf and fix the sums on its way up, O(log n) scalar steps
+        tree = self.tree
+        pos = idx + self.leaves
+        tree[pos] = priority
+        pos //= 2
+        while pos >= 1:
+            tree[pos] = tree[2 * pos] + tree[2 * pos + 1]
+            pos //= 2
+
+    def update(self, indices, priorities):
+        # Same for a batch: one vectorized pass per tree level
+        nodes = np.asarray(indices) + self.leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            if nodes[0] == 1:
+                break
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        # Leaf index whose prefix-sum range contains each value, descending all values together
+        idx = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while idx[0] < self.leaves:
+            left = 2 * idx
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values -= np.where(go_right, left_sum, 0)
+            idx = left + go_right
+        return idx - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, beta_increment=1e-4, eps=1e-5, **kwargs):
+        super().__init__(capacity, state_size, **kwargs)
+
+        # How strongly priorities skew sampling, and how much importance weights correct for it (annealed to 1)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+
+        # New transitions get the largest priority seen so far, so each is replayed at least once
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+
+        # Priorities are not persisted, a reopened buffer starts uniform
+        if self.size:
+            self.tree.update(np.arange(self.size), np.ones(self.size))
+
+    def push(self, state, action, reward, next_state, done):
+        idx = self.position
+        super().push(state, action, reward, next_state, done)
+        self.tree.update_one(idx, self.max_priority ** self.alpha)
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        idx = (self.position + np.arange(len(rewards))) % self.capacity
+        super().push_batch(states, actions, rewards, next_states, dones)
+        self.tree.update(idx, np.full(len(idx), self.max_priority ** self.alpha))
+
+    def sample(self, batch_size):
+        # One value per equal slice of the total priority (stratified), all looked up in one descent
+        n = min(batch_size, self.size)
+        total = self.tree.total
+        values = (np.arange(n) + self.rng.random(n)) * (total / n)
+        idx = np.minimum(self.tree.find(values), self.size - 1)
+
+        # Importance-sampling weights, normalized so the largest is 1
+        probs = self.tree.tree[idx + self.tree.leaves] / total
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        return (
+            torch.from_numpy(self.states[idx]),
+            torch.from_numpy(self.actions[idx]),
+            torch.from_numpy(self.rewards[idx]),
+            torch.from_numpy(self.next_states[idx]),
+            torch.from_numpy(self.dones[idx]),
+            torch.from_numpy(weights.astype(np.float32)),
+            idx,
+        )
+
+    def update_priorities(self, indices, td_errors):
+        priorities = np.abs(td_errors) + self.eps
+        self.tree.update(indices, priorities ** self.alpha)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+
+class NStepBuilder:
+    def __init__(self, n, gamma):
+        # Rolling window of the last n (state, action, reward) steps
+        self.n = n
+        self.gamma = gamma
+        self.window = deque()
+
+    def _discounted_return(self):
+        discounted = 0.0
+        for _, _, reward in reversed(self.window):
+            discounted = reward + self.gamma * discounted
+        return discounted
+
+    def push(self, state, action, reward, next_state, done):
+        # Returns the n-step transitions completed by this step: (state, action, return, next_state, done),
+        # where next_state is n steps later and bootstraps with gamma ** n
+        self.window.append((state, action, reward))
+        transitions = []
+
+        if done:
+            # Episode over: every step still in the window gets its (shorter) return, with no bootstrap
+            while self.window:
+                first_state, first_action, _ = self.window[0]
+                transitions.append((first_state, first_action, self._discounted_return(), next_state, True))
+                self.window.popleft()
+
+        elif len(self.window) == self.n:
+            first_state, first_action, _ = self.window[0]
+            transitions.append((first_state, first_action, self._discounted_return(), next_state, False))
+            self.window.popleft()
+
+        return transitions
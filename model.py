@@ -2,6 +2,8 @@ import torch
 import torch.nn as nn 
 import torch.optim as optim
 import torch.nn.functional as F
+import numpy as np
+import copy
 import os
 
 # TODO: needs more comments
@@ -17,6 +19,10 @@ class Linear_QNet(nn.Module):
         x = self.linear2(x)
         return x
 
+    # Greedy action index for one state, or an array of indices for a batch of states
+    def predict(self, state):
+        return predict_actions(self, state)
+
     def save(self, file_name='model.pth'):
         model_folder_path = './model'
         if not os.path.exists(model_folder_path):
@@ -25,20 +31,98 @@ class Linear_QNet(nn.Module):
         file_name = os.path.join(model_folder_path, file_name)
         torch.save(self.state_dict(), file_name)
 
+    def load(self, file_name='model.pth'):
+        file_name = os.path.join('./model', file_name)
+        self.load_state_dict(torch.load(file_name))
+
+
+def predict_actions(net, state):
+    # No autograd bookkeeping for decisions
+    with torch.inference_mode():
+        state = torch.as_tensor(state, dtype=torch.float)
+
+        # Always run as a batch, quantized linear layers only take 2D input
+        single = state.dim() == 1
+        if single:
+            state = state.unsqueeze(0)
+
+        move = torch.argmax(net(state), dim=1)
+
+    if single:
+        return move.item()
+    return move.numpy()
+
+
+class InferencePolicy:
+    # Decision-only view of a Linear_QNet, optionally as a frozen TorchScript or int8-quantized copy
+    def __init__(self, model, mode=None):
+        if mode not in (None, 'script', 'quantized'):
+            raise ValueError(f'unknown inference mode: {mode}')
+
+        self.model = model
+        self.mode = mode
+        self.sync()
+
+    # Rebuild the copy after the model's weights change (nothing to do when using the model directly)
+    def sync(self):
+        if self.mode is None:
+            self.net = self.model
+            return
+
+        net = copy.deepcopy(self.model).eval()
+        if self.mode == 'script':
+            self.net = torch.jit.freeze(torch.jit.script(net))
+        else:
+            self.net = torch.ao.quantization.quantize_dynamic(net, {nn.Linear}, dtype=torch.qint8)
+
+    def predict(self, state):
+        return predict_actions(self.net, state)
+
 
 class QTrainer:
-    def __init__(self, model, lr, gamma):
+    def __init__(self, model, lr, gamma, target_update=0, tau=None, double=False):
         self.lr = lr
         self.gamma = gamma
         self.model = model
         self.optimizer = optim.Adam(model.parameters(), lr=self.lr)
         self.criterion = nn.MSELoss()
 
-    def train_step(self, state, action, reward, next_state, done):
-        state = torch.tensor(state, dtype=torch.float)
-        next_state = torch.tensor(next_state, dtype=torch.float)
-        action = torch.tensor(action, dtype=torch.long)
-        reward = torch.tensor(reward, dtype=torch.float)
+        # Target network: hard copy every target_update steps, or Polyak average with rate tau every step.
+        # Without either, targets bootstrap from the model being trained
+        self.target_update = target_update
+        self.tau = tau
+        self.target_model = None
+        if target_update or tau is not None:
+            self.target_model = copy.deepcopy(model)
+            self.target_model.requires_grad_(False)
+
+        # Double DQN: the online model picks the next action, the target network scores it
+        self.double = double
+        self.steps = 0
+
+    def _update_target(self):
+        if self.target_model is None:
+            return
+
+        if self.tau is not None:
+            with torch.no_grad():
+                for target_param, param in zip(self.target_model.parameters(), self.model.parameters()):
+                    target_param.lerp_(param, self.tau)
+        elif self.steps % self.target_update == 0:
+            self.target_model.load_state_dict(self.model.state_dict())
+
+    def _to_tensor(self, value, dtype):
+        # Accept tensors as they are, stack lists/tuples of arrays through NumPy in one copy
+        if isinstance(value, torch.Tensor):
+            return value.to(dtype)
+        return torch.as_tensor(np.asarray(value), dtype=dtype)
+
+    def train_step(self, state, action, reward, next_state, done, weights=None):
+        state = self._to_tensor(state, torch.float)
+        next_state = self._to_tensor(next_state, torch.float)
+        action = self._to_tensor(action, torch.long)
+        reward = self._to_tensor(reward, torch.float)
+        done = self._to_tensor(done, torch.bool)
         # (n, x)
 
         if len(state.shape) == 1:
@@ -47,24 +131,47 @@ class QTrainer:
             next_state = torch.unsqueeze(next_state, 0)
             action = torch.unsqueeze(action, 0)
             reward = torch.unsqueeze(reward, 0)
-            done = (done, )
+            done = torch.unsqueeze(done, 0)
+
+        # Actions are indices (n,); one-hot rows (n, 3) are still accepted
+        if action.dim() == 2:
+            action = torch.argmax(action, dim=1)
 
         # 1: predicted Q values with current state
         pred = self.model(state)
 
-        target = pred.clone()
-        for idx in range(len(done)):
-            Q_new = reward[idx]
-            if not done[idx]:
-                Q_new = reward[idx] + self.gamma * torch.max(self.model(next_state[idx]))
-
-            target[idx][torch.argmax(action[idx]).item()] = Q_new
-    
         # 2: Q_new = r + y * max(next_predicted Q value) -> only do this if not done
-        # pred.clone()
-        # preds[argmax(action)] = Q_new
+        # One forward pass over the whole batch, terminal samples are masked out
+        with torch.no_grad():
+            bootstrap_model = self.target_model if self.target_model is not None else self.model
+            next_q = bootstrap_model(next_state)
+
+            if self.double:
+                next_action = torch.argmax(self.model(next_state), dim=1, keepdim=True)
+                next_q = next_q.gather(1, next_action).squeeze(1)
+            else:
+                next_q = next_q.max(dim=1).values
+
+            Q_new = reward + self.gamma * next_q * (~done)
+
+        # preds[action] = Q_new
+        action_idx = action.unsqueeze(1)
+        target = pred.detach().clone()
+        target.scatter_(1, action_idx, Q_new.unsqueeze(1))
+
         self.optimizer.zero_grad()
-        loss = self.criterion(target, pred)
+        if weights is None:
+            loss = self.criterion(target, pred)
+        else:
+            # Importance-sampling weights from prioritized replay scale each sample's squared error
+            weights = self._to_tensor(weights, torch.float)
+            loss = (weights.unsqueeze(1) * (target - pred) ** 2).mean()
         loss.backward()
 
-        self.optimizer.step()
\ No newline at end of file
+        self.optimizer.step()
+
+        self.steps += 1
+        self._update_target()
+
+        # TD errors of the taken actions, used to reprioritize replayed samples
+        return (Q_new - pred.detach().gather(1, action_idx).squeeze(1)).abs().numpy()
@@ -0,0 +1,92 @@
+import random
+from model import Linear_QNet
+from checkpoint import load_model_weights
+from game import UP, DOWN, STOP
+
+"""
+Policies for the right paddle, passed to Game.play_step as opponent_action:
+    - TrackingOpponent: scripted, follows the ball with a dead zone and some reaction lag
+    - SnapshotOpponent: greedy frozen Linear_QNet loaded from a model or checkpoint file
+    - SelfPlayOpponent: the agent's own live model, playing from the mirrored side
+
+Opponents return action indices (UP, DOWN, STOP) from act(game), called once per frame.
+Self-play opponents set self_play so the training loop can batch their state with the
+agent's in one forward pass.
+"""
+
+# Tracker: pixels between the paddle's center and the ball it tolerates, and the chance per frame
+# it reacts at all (otherwise it repeats its last move), so it can be beaten
+DEAD_ZONE = 10
+SKILL = 0.8
+
+
+class Opponent:
+    self_play = False
+
+    def act(self, game):
+        raise NotImplementedError
+
+
+class TrackingOpponent(Opponent):
+    def __init__(self, dead_zone=DEAD_ZONE, skill=SKILL, seed=None):
+        self.dead_zone = dead_zone
+        self.skill = skill
+        self.rng = random.Random(seed)
+        self.move = STOP
+
+    def act(self, game):
+        if self.rng.random() < self.skill:
+            center = game.right_paddle.y + game.right_paddle.height/2
+            if game.pong.y < center - self.dead_zone:
+                self.move = UP
+            elif game.pong.y > center + self.dead_zone:
+                self.move = DOWN
+            else:
+                self.move = STOP
+
+        return self.move
+
+
+class SnapshotOpponent(Opponent):
+    def __init__(self, file_name, features):
+        # features: the agent's extractor mirrored, so the snapshot sees the court from its own side
+        self.features = features
+
+        state_dict = load_model_weights(file_name)
+        input_size = state_dict['linear1.weight'].shape[1]
+        if input_size != features.size:
+            raise ValueError(f'{file_name} takes {input_size} features, the agent uses {features.size}')
+
+        self.model = Linear_QNet(input_size, state_dict['linear1.weight'].shape[0], 3)
+        self.model.load_state_dict(state_dict)
+        self.model.eval()
+
+    def act(self, game):
+        return self.model.predict(self.features.extract(game))
+
+
+class SelfPlayOpponent(Opponent):
+    self_play = True
+
+    def __init__(self, agent):
+        # The agent plays itself: same model, mirrored features
+        self.agent = agent
+        self.features = agent.features.mirrored()
+
+    def get_state(self, game):
+        return self.features.extract(game)
+
+    # Unbatched fallback; the training loop passes get_state to Agent.get_action instead
+    def act(self, game):
+        return self.agent.policy.predict(self.get_state(game))
+
+
+def make_opponent(spec, agent, seed=None):
+    # None or 'none': keyboard only, 'tracker', 'self', or a model/checkpoint file to play against
+    if spec is None or spec == 'none':
+        return None
+    if spec == 'tracker':
+        return TrackingOpponent(seed=seed)
+    if spec == 'self':
+        return SelfPlayOpponent(agent)
+    return SnapshotOpponent(spec, agent.features.mirrored())
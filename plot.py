@@ -1,19 +1,154 @@
-import matplotlib.pyplot as plt
-from IPython import display
+import os
+import sys
+import time
+import queue
+import signal
+import multiprocessing as mp
 
-plt.ion()
+# Seconds between redraws
+PLOT_INTERVAL = 5
 
-def plot(scores, mean_scores):
-    display.clear_output(wait=True)
-    display.display(plt.gcf())
+# Points kept per line, older history is thinned out so redraw cost stays flat
+MAX_POINTS = 1000
+
+# Where headless runs write scores.png and scores.csv
+PLOT_FOLDER = './plots'
+
+
+class _History:
+    def __init__(self, max_points):
+        self.max_points = max_points
+
+        # Keep every stride-th game, doubling the stride whenever the history fills up
+        self.stride = 1
+        self.games = []
+        self.scores = []
+        self.mean_scores = []
+        self.n_games = 0
+        self.last = None
+
+    def append(self, score, mean_score):
+        self.n_games += 1
+        self.last = (score, mean_score)
+
+        if (self.n_games - 1) % self.stride == 0:
+            self.games.append(self.n_games - 1)
+            self.scores.append(score)
+            self.mean_scores.append(mean_score)
+
+        if len(self.games) > self.max_points:
+            self.stride *= 2
+            self.games = self.games[::2]
+            self.scores = self.scores[::2]
+            self.mean_scores = self.mean_scores[::2]
+
+
+def _draw(plt, history, headless, folder):
     plt.clf()
     plt.title('Training...')
     plt.xlabel('Number of Games')
     plt.ylabel('Score')
-    plt.plot(scores)
-    plt.plot(mean_scores)
+    plt.plot(history.games, history.scores)
+    plt.plot(history.games, history.mean_scores)
     plt.ylim(ymin=0)
-    plt.text(len(scores)-1, scores[-1], str(scores[-1]))
-    plt.text(len(mean_scores)-1, mean_scores[-1], str(mean_scores[-1]))
-    plt.show(block=False)
-    plt.pause(.1)
\ No newline at end of file
+
+    # Label the most recent game even if it was thinned out of the plotted history
+    score, mean_score = history.last
+    plt.text(history.n_games-1, score, str(score))
+    plt.text(history.n_games-1, mean_score, str(mean_score))
+
+    if headless:
+        plt.savefig(os.path.join(folder, 'scores.png'))
+    else:
+        plt.gcf().canvas.draw_idle()
+        plt.pause(0.001)
+
+
+def _consume(updates, scores, mean_scores, interval, headless, folder, max_points):
+    # Ctrl+C is for the training process, which closes the plotter itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Only the plotting process ever loads matplotlib
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    if not headless:
+        plt.ion()
+
+    history = _History(max_points)
+    for score, mean_score in zip(scores, mean_scores):
+        history.append(score, mean_score)
+
+    # Full history goes to CSV in headless runs, one line per game
+    csv_file = None
+    if headless:
+        os.makedirs(folder, exist_ok=True)
+        csv_file = open(os.path.join(folder, 'scores.csv'), 'w')
+        csv_file.write('game,score,mean_score\n')
+        for game, (score, mean_score) in enumerate(zip(scores, mean_scores), 1):
+            csv_file.write(f'{game},{score},{mean_score}\n')
+
+    dirty = history.n_games > 0
+    next_draw = time.monotonic()
+    running = True
+
+    while running:
+        # Drain everything queued since the last pass
+        try:
+            update = updates.get(timeout=0.1)
+            while True:
+                if update is None:
+                    running = False
+                    break
+
+                score, mean_score = update
+                history.append(score, mean_score)
+                if csv_file is not None:
+                    csv_file.write(f'{history.n_games},{score},{mean_score}\n')
+                dirty = True
+
+                update = updates.get_nowait()
+        except queue.Empty:
+            pass
+
+        # Redraw at most every interval seconds, and once more on close
+        now = time.monotonic()
+        if dirty and (now >= next_draw or not running):
+            _draw(plt, history, headless, folder)
+            if csv_file is not None:
+                csv_file.flush()
+            dirty = False
+            next_draw = now + interval
+        elif not headless:
+            # Keep the window responsive between redraws
+            plt.gcf().canvas.flush_events()
+
+    if csv_file is not None:
+        csv_file.close()
+
+
+class Plotter:
+    # Plots training scores from a background process so the training loop never waits on matplotlib
+    def __init__(self, scores=(), mean_scores=(), interval=PLOT_INTERVAL, headless=None, folder=PLOT_FOLDER, max_points=MAX_POINTS):
+        # Without a display, write PNG/CSV files instead of opening a window
+        if headless is None:
+            headless = sys.platform.startswith('linux') and not os.environ.get('DISPLAY')
+
+        ctx = mp.get_context('spawn')
+        self.updates = ctx.Queue()
+        self.process = ctx.Process(
+            target=_consume,
+            args=(self.updates, list(scores), list(mean_scores), interval, headless, folder, max_points),
+            daemon=True,
+        )
+        self.process.start()
+
+    def update(self, score, mean_score):
+        self.updates.put((score, mean_score))
+
+    # Draw the final state and stop the background process
+    def close(self):
+        self.updates.put(None)
+        self.process.join()
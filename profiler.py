@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import cProfile
+import pstats
+
+"""
+Training-loop instrumentation:
+    - with profiler.timer('play_step'): ...  -> calls and wall time per named stage
+    - profiler.count('frames')               -> named counters
+    - profiler.end_episode()                 -> writes a JSONL summary every summary_every episodes
+
+Optionally captures cProfile (and torch.profiler) over a window of episodes.
+"""
+
+# Summary line every N episodes
+SUMMARY_EVERY = 10
+
+# Where summaries are appended
+PROFILE_LOG = './logs/profile.jsonl'
+
+
+class _Timer:
+    __slots__ = ('stats', 'start')
+
+    def __init__(self, stats):
+        # stats: [calls, total seconds], shared with the profiler
+        self.stats = stats
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        stats = self.stats
+        stats[0] += 1
+        stats[1] += time.perf_counter() - self.start
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    def __init__(self, enabled=True, log_path=PROFILE_LOG, summary_every=SUMMARY_EVERY, profile_episodes=0, torch_profile=False):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.summary_every = summary_every
+
+        # Timers and counters for the current summary window
+        self.timers = {}
+        self.counters = {}
+        self.episodes = 0
+        self.window_start = time.perf_counter()
+
+        # cProfile/torch.profiler capture over the next profile_episodes episodes
+        self.profile_episodes = profile_episodes
+        self.torch_profile = torch_profile
+        self._cprofile = None
+        self._torch_profiler = None
+        if self.enabled and self.profile_episodes:
+            self._start_capture()
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = _Timer([0, 0.0])
+        return timer
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _start_capture(self):
+        self._cprofile = cProfile.Profile()
+        self._cprofile.enable()
+
+        if self.torch_profile:
+            import torch.profiler
+            self._torch_profiler = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU])
+            self._torch_profiler.__enter__()
+
+    def _stop_capture(self):
+        self._cprofile.disable()
+        folder = os.path.dirname(self.log_path) or '.'
+        os.makedirs(folder, exist_ok=True)
+
+        # Raw stats for snakeviz/pstats, plus the top entries on stdout
+        self._cprofile.dump_stats(os.path.join(folder, 'train.prof'))
+        pstats.Stats(self._cprofile).sort_stats('cumulative').print_stats(20)
+        self._cprofile = None
+
+        if self._torch_profiler is not None:
+            self._torch_profiler.__exit__(None, None, None)
+            self._torch_profiler.export_chrome_trace(os.path.join(folder, 'torch_trace.json'))
+            print(self._torch_profiler.key_averages().table(sort_by='cpu_time_total', row_limit=20))
+            self._torch_profiler = None
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.window_start
+        return {
+            'episodes': self.episodes,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'elapsed_s': elapsed,
+            'timers': {
+                name: {
+                    'calls': timer.stats[0],
+                    'total_s': timer.stats[1],
+                    'mean_us': timer.stats[1] / timer.stats[0] * 1e6 if timer.stats[0] else 0.0,
+                    'share': timer.stats[1] / elapsed if elapsed else 0.0,
+                }
+                for name, timer in self.timers.items()
+            },
+            'counters': dict(self.counters),
+        }
+
+    def end_episode(self):
+        if not self.enabled:
+            return
+
+        self.episodes += 1
+
+        if self._cprofile is not None and self.episodes >= self.profile_episodes:
+            self._stop_capture()
+
+        if self.log_path is not None and self.episodes % self.summary_every == 0:
+            folder = os.path.dirname(self.log_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(self.summary()) + '\n')
+
+            # Start a fresh window, keeping the timer objects so cached references stay valid
+            for timer in self.timers.values():
+                timer.stats[0] = 0
+                timer.stats[1] = 0.0
+            self.counters.clear()
+            self.window_start = time.perf_counter()
@@ -0,0 +1,96 @@
+import math
+import time
+
+"""
+Incremental drawing for watch mode:
+    - shapes: callables that draw onto the window and return the Rect they covered
+      (Pong.draw, Paddle.draw); each frame only last frame's and this frame's rects are redrawn
+    - texts: rendered once per distinct value and re-blitted only when they change or a shape crossed them
+    - frame cap: at most max_fps frames are drawn per second, the simulation is never slowed down
+
+pygame is imported when a Renderer is created, so importing this module is free.
+"""
+
+# Drawn frames per second, None draws every frame that asks
+MAX_FPS = 60
+
+# RGB colors
+WHITE = (255,255,255)
+BLACK = (0,0,0)
+
+
+class Renderer:
+    def __init__(self, window, max_fps=MAX_FPS, background=BLACK, font_size=32):
+        import pygame
+
+        self.window = window
+        self.background = background
+        self.font = pygame.font.Font(None, font_size)
+
+        self.min_interval = 1 / max_fps if max_fps else 0
+        self.last_frame = -math.inf
+
+        # name -> {'text', 'surface', 'rect', 'erase', 'blit'}
+        self.texts = {}
+
+        # Rects covered by last frame's shapes, erased before the next one
+        self.drawn = []
+        self.full_redraw = True
+
+    # False when the last drawn frame is too recent; callers skip drawing (and building texts)
+    def ready(self):
+        now = time.perf_counter()
+        if now - self.last_frame < self.min_interval:
+            return False
+        self.last_frame = now
+        return True
+
+    # Set a text label, positioned with Rect keywords (topleft=..., center=...); only new values are rendered
+    def text(self, name, text, **position):
+        entry = self.texts.get(name)
+        if entry is not None and entry['text'] == text:
+            return
+
+        surface = self.font.render(text, True, WHITE, self.background)
+        self.texts[name] = {
+            'text': text,
+            'surface': surface,
+            'rect': surface.get_rect(**position),
+            'erase': entry['rect'] if entry is not None else None,
+            'blit': True,
+        }
+
+    def render(self, shapes):
+        import pygame
+
+        dirty = []
+
+        if self.full_redraw:
+            self.window.fill(self.background)
+        else:
+            # Clear where shapes were last frame, and old labels that changed
+            for rect in self.drawn:
+                self.window.fill(self.background, rect)
+            dirty.extend(self.drawn)
+
+        for entry in self.texts.values():
+            if entry['erase'] is not None:
+                self.window.fill(self.background, entry['erase'])
+                dirty.append(entry['erase'])
+                entry['erase'] = None
+
+        self.drawn = [shape() for shape in shapes]
+        dirty.extend(self.drawn)
+
+        # Labels stay on top: re-blit those that changed or were touched by a shape
+        for entry in self.texts.values():
+            if self.full_redraw or entry['blit'] or entry['rect'].collidelist(dirty) != -1:
+                self.window.blit(entry['surface'], entry['rect'])
+                dirty.append(entry['rect'])
+                entry['blit'] = False
+
+        if self.full_redraw:
+            pygame.display.update()
+            self.full_redraw = False
+        else:
+            pygame.display.update(dirty)
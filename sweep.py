@@ -0,0 +1,216 @@
+import os
+import csv
+import math
+import time
+import random
+import itertools
+import contextlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+"""
+Hyperparameter sweeps: many short, isolated training runs across a process pool.
+
+Each argument is name=spec for one Agent hyperparameter
+(lr, batch_size, hidden_size, max_memory, epsilon_start, epsilon_decay):
+    - 0.001,0.0005      a list of values
+    - 40:120            uniform range (integers if both ends are), --samples only
+    - log:1e-4:1e-2     log-uniform range, --samples only
+
+    python sweep.py lr=0.001,0.0005 batch_size=500,1000 hidden_size=128,256 --games 300
+    python sweep.py lr=log:1e-4:1e-2 epsilon_start=40:120 --samples 20 --games 300
+
+Without --samples every combination is run (grid search). Each run trains in its own
+directory under ./sweeps (model, checkpoints, logs and train.log), and one row per run
+is written to results.csv as runs finish.
+"""
+
+SWEEP_FOLDER = './sweeps'
+
+# Training games per run
+GAMES = 300
+
+# Hopeless runs: stop once the mean score is still below MIN_MEAN_SCORE after PATIENCE games
+PATIENCE = 100
+MIN_MEAN_SCORE = 0.5
+
+# Torch threads per run, workers default to cores // THREADS
+THREADS = 1
+
+PARAMS = ('lr', 'batch_size', 'hidden_size', 'max_memory', 'epsilon_start', 'epsilon_decay')
+RESULTS = ('games', 'mean_score', 'record', 'env_steps', 'updates', 'stopped_early', 'seconds')
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_spec(arg):
+    # 'name=spec' -> (name, spec) where spec is ('list', values), ('range', lo, hi) or ('log', lo, hi)
+    name, _, spec = arg.partition('=')
+    if name not in PARAMS:
+        raise ValueError(f'unknown hyperparameter {name!r}, expected one of {", ".join(PARAMS)}')
+
+    if spec.startswith('log:'):
+        lo, hi = spec[4:].split(':')
+        return name, ('log', float(lo), float(hi))
+    if ':' in spec:
+        lo, hi = spec.split(':')
+        return name, ('range', _number(lo), _number(hi))
+    return name, ('list', [_number(value) for value in spec.split(',')])
+
+
+def grid(specs):
+    for name, spec in specs.items():
+        if spec[0] != 'list':
+            raise ValueError(f'{name}: ranges need --samples, a grid takes lists of values')
+
+    names = list(specs)
+    for values in itertools.product(*(specs[name][1] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_search(specs, samples, rng):
+    for _ in range(samples):
+        params = {}
+        for name, spec in specs.items():
+            if spec[0] == 'list':
+                params[name] = rng.choice(spec[1])
+            elif spec[0] == 'log':
+                params[name] = math.exp(rng.uniform(math.log(spec[1]), math.log(spec[2])))
+            elif isinstance(spec[1], int) and isinstance(spec[2], int):
+                params[name] = rng.randint(spec[1], spec[2])
+            else:
+                params[name] = rng.uniform(spec[1], spec[2])
+        yield params
+
+
+def _init_worker(threads, cpu_sets):
+    # Each worker gets a fixed thread count, and its own cores when pinning
+    import torch
+    torch.set_num_threads(threads)
+
+    if cpu_sets is not None:
+        os.sched_setaffinity(0, cpu_sets.get())
+
+
+def run(idx, params, folder, games, seed, patience, min_mean_score):
+    # One training run, in its own directory so models, checkpoints and logs never collide
+    run_folder = os.path.join(folder, f'run_{idx:03d}')
+    os.makedirs(run_folder, exist_ok=True)
+    os.chdir(run_folder)
+
+    from agent import train
+
+    def hopeless(n_games, score, mean_score):
+        return n_games >= patience and mean_score < min_mean_score
+
+    start = time.perf_counter()
+    with open('train.log', 'w') as log, contextlib.redirect_stdout(log):
+        result = train(
+            seed=seed,
+            max_games=games,
+            should_stop=hopeless,
+            plot=False,
+            agent_kwargs=params,
+        )
+    result['seconds'] = time.perf_counter() - start
+
+    return idx, result
+
+
+def _write_results(file_name, rows, names):
+    with open(file_name, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['run', *names, *RESULTS])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def sweep(runs, folder=None, games=GAMES, seed=0, patience=PATIENCE, min_mean_score=MIN_MEAN_SCORE,
+          workers=None, threads=THREADS, pin=False):
+    if folder is None:
+        folder = os.path.join(SWEEP_FOLDER, time.strftime('%Y%m%d-%H%M%S'))
+    folder = os.path.abspath(folder)
+    os.makedirs(folder, exist_ok=True)
+
+    workers = workers or max(1, os.cpu_count() // threads)
+    names = sorted({name for params in runs for name in params})
+
+    ctx = mp.get_context('spawn')
+
+    # Split the cores this process may use into one disjoint set per worker
+    cpu_sets = None
+    if pin:
+        cpus = sorted(os.sched_getaffinity(0))
+        cpu_sets = ctx.Queue()
+        for worker in range(workers):
+            cpu_sets.put(set(cpus[worker * threads:(worker + 1) * threads]) or set(cpus))
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(threads, cpu_sets)) as pool:
+        futures = [
+            pool.submit(run, idx, params, folder, games, seed, patience, min_mean_score)
+            for idx, params in enumerate(runs)
+        ]
+
+        for future in as_completed(futures):
+            idx, result = future.result()
+            rows.append({'run': idx, **runs[idx], **result})
+            print(f'run {idx:3d} {runs[idx]}: mean score {result["mean_score"]:.2f} over {result["games"]} games'
+                  f'{" (stopped early)" if result["stopped_early"] else ""}')
+
+            # Rewritten after every run so a long sweep can be inspected (or killed) midway
+            _write_results(os.path.join(folder, 'results.csv'), rows, names)
+
+    rows.sort(key=lambda row: row['mean_score'], reverse=True)
+    _write_results(os.path.join(folder, 'results.csv'), rows, names)
+    return rows, folder
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('specs', nargs='+', metavar='name=spec', help='hyperparameter values or ranges, see above')
+    parser.add_argument('--samples', type=int, default=None, help='random search with this many runs instead of a grid')
+    parser.add_argument('--games', type=int, default=GAMES, help='training games per run')
+    parser.add_argument('--seed', type=int, default=0, help='seed shared by every run, and for sampling')
+    parser.add_argument('--patience', type=int, default=PATIENCE, help='games before a run can be stopped early')
+    parser.add_argument('--min-mean-score', type=float, default=MIN_MEAN_SCORE, help='stop runs whose mean score is lower')
+    parser.add_argument('--workers', type=int, default=None, help='parallel runs (default: cores // threads)')
+    parser.add_argument('--threads', type=int, default=THREADS, help='torch threads per run')
+    parser.add_argument('--pin', action='store_true', help='pin each worker to its own cores')
+    parser.add_argument('--folder', default=None, help='output directory (default: ./sweeps/<time>)')
+    args = parser.parse_args()
+
+    try:
+        specs = dict(parse_spec(arg) for arg in args.specs)
+        if args.samples is None:
+            runs = list(grid(specs))
+        else:
+            runs = list(random_search(specs, args.samples, random.Random(args.seed)))
+    except ValueError as e:
+        parser.error(str(e))
+
+    rows, folder = sweep(
+        runs,
+        folder=args.folder,
+        games=args.games,
+        seed=args.seed,
+        patience=args.patience,
+        min_mean_score=args.min_mean_score,
+        workers=args.workers,
+        threads=args.threads,
+        pin=args.pin,
+    )
+
+    names = sorted({name for params in runs for name in params})
+    print()
+    print(' '.join(f'{name:>14s}' for name in ['run', *names, 'mean_score', 'record', 'games', 'seconds']))
+    for row in rows:
+        values = [row['run'], *(row[name] for name in names), row['mean_score'], row['record'], row['games'], row['seconds']]
+        print(' '.join(f'{value:14.4g}' if isinstance(value, float) else f'{value:>14}' for value in values))
+    print('Results in', os.path.join(folder, 'results.csv'))
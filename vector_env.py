@@ -0,0 +1,223 @@
+import random
+import numpy as np
+
+"""
+Batched version of game.Game: N games stored as NumPy arrays and stepped together.
+
+Physics, rewards, resets and per-episode seeding follow Game frame for frame,
+so VectorPongEnv(1, seeds=[s]) and Game(seed=s) produce identical trajectories.
+
+Actions:
+    - UP: 0
+    - DOWN: 1
+    - STOP: 2
+
+States:
+    - [left_paddle.y, pong.y, abs(pong.y-left_paddle.y)] per game as ints, or
+    - with features=features.FeatureExtractor(n_games=N, ...), the same float32 features as Agent.get_state
+
+step() resets finished games right away: states holds their first state of the new episode, to pick
+the next action from, and terminal_states the state they ended in, to store as the transition's next state.
+"""
+
+# Same layout as game.Game
+WINDOW_WIDTH = 1000
+WINDOW_HEIGHT = 600
+BALL_RADIUS = 15
+PADDLE_WIDTH = 20
+PADDLE_HEIGHT = 120
+PADDLE_SPEED = 8
+
+# Paddle velocity for each action: [UP, DOWN, STOP]
+ACTION_VELOCITY = np.array([-PADDLE_SPEED, PADDLE_SPEED, 0], dtype=np.float64)
+
+
+class VectorPongEnv:
+    def __init__(self, n_games, seeds=None, features=None):
+        self.n_games = n_games
+        self.features = features
+        self.width, self.height = WINDOW_WIDTH, WINDOW_HEIGHT
+        self.radius = BALL_RADIUS
+
+        # Paddle x positions are fixed
+        self.left_paddle_x = 50-PADDLE_WIDTH/2
+        self.right_paddle_x = self.width - PADDLE_WIDTH - 50
+
+        # Per-game seed sources and per-episode RNGs, as in Game; draws only happen on resets
+        # so Python RNGs are cheap enough
+        if seeds is None:
+            seeds = [None] * n_games
+        self.seed_rngs = [random.Random(seed) for seed in seeds]
+        self.rngs = [None] * n_games
+        self.episode_seeds = np.zeros(n_games, dtype=np.int64)
+
+        # Ball position and velocity
+        self.ball_x = np.zeros(n_games)
+        self.ball_y = np.zeros(n_games)
+        self.vel_x = np.zeros(n_games)
+        self.vel_y = np.zeros(n_games)
+
+        # Paddle positions and velocities
+        self.left_paddle_y = np.zeros(n_games)
+        self.right_paddle_y = np.zeros(n_games)
+        self.left_paddle_vel = np.zeros(n_games)
+        self.right_paddle_vel = np.zeros(n_games)
+
+        # Scores and frame counters
+        self.ai_score = np.zeros(n_games, dtype=np.int64)
+        self.player_score = np.zeros(n_games, dtype=np.int64)
+        self.frame_iteration = np.zeros(n_games, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        # Reset every game, or only those selected by a boolean mask
+        self._reset(mask)
+        return self.get_states()
+
+    def _reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.n_games, dtype=bool)
+
+        self.ball_x[mask] = self.width/2-self.radius
+        self.ball_y[mask] = self.height/2-self.radius
+        self.left_paddle_y[mask] = self.height/2 - PADDLE_HEIGHT/2
+        self.right_paddle_y[mask] = self.height/2 - PADDLE_HEIGHT/2
+        self.left_paddle_vel[mask] = 0
+        self.right_paddle_vel[mask] = 0
+        self.ai_score[mask] = 0
+        self.player_score[mask] = 0
+        self.frame_iteration[mask] = 0
+
+        # Same seeding and draws, in the same order, as Game.reset and Pong.__init__
+        for idx in np.flatnonzero(mask):
+            self.episode_seeds[idx] = self.seed_rngs[idx].getrandbits(32)
+            rng = self.rngs[idx] = random.Random(int(self.episode_seeds[idx]))
+            self.vel_x[idx], self.vel_y[idx] = rng.choice([-8,8]),rng.choice([-8,8])
+
+        # New episodes start new frame stacks
+        if self.features is not None:
+            self.features.reset(mask)
+
+    def get_states(self):
+        if self.features is not None:
+            return self.features.extract_batch(self)
+
+        states = np.empty((self.n_games, 3), dtype=int)
+        states[:, 0] = self.left_paddle_y
+        states[:, 1] = self.ball_y
+        states[:, 2] = np.abs(self.ball_y - self.left_paddle_y)
+        return states
+
+    def _refresh_states(self, states, mask):
+        # Overwrite the masked rows of a get_states result with the games' current state
+        if self.features is not None:
+            self.features.refresh(self, mask)
+            return
+
+        states[mask, 0] = self.left_paddle_y[mask]
+        states[mask, 1] = self.ball_y[mask]
+        states[mask, 2] = np.abs(self.ball_y[mask] - self.left_paddle_y[mask])
+
+    def _handle_collisions(self):
+        # Ball within the left paddle: push it to the paddle face and reverse
+        hit = (
+            (self.left_paddle_x <= self.ball_x) & (self.ball_x <= self.left_paddle_x + PADDLE_WIDTH)
+            & (self.left_paddle_y <= self.ball_y) & (self.ball_y <= self.left_paddle_y + PADDLE_HEIGHT)
+        )
+        self.ball_x[hit] = self.left_paddle_x + PADDLE_WIDTH
+        self.vel_x[hit] *= -1
+
+        # Ball within the right paddle
+        hit = (
+            (self.right_paddle_x <= self.ball_x) & (self.ball_x <= self.right_paddle_x + PADDLE_WIDTH)
+            & (self.right_paddle_y <= self.ball_y) & (self.ball_y <= self.right_paddle_y + PADDLE_HEIGHT)
+        )
+        self.ball_x[hit] = self.right_paddle_x - PADDLE_WIDTH
+        self.vel_x[hit] *= -1
+
+    def _move_paddles(self):
+        # Paddle.move: apply velocity, then keep within window dimensions
+        for paddle_y, paddle_vel in (
+            (self.left_paddle_y, self.left_paddle_vel),
+            (self.right_paddle_y, self.right_paddle_vel),
+        ):
+            paddle_y += paddle_vel
+            np.minimum(paddle_y, self.height - PADDLE_HEIGHT, out=paddle_y)
+            np.maximum(paddle_y, 0, out=paddle_y)
+
+    def _move_ball(self):
+        r = self.radius
+
+        # Bounce off the bottom (the x check mirrors Pong.move)
+        bounce = (self.ball_x <= r) | (self.ball_y >= self.height - r)
+        self.vel_y[bounce] *= -1
+
+        # Bounce off the top
+        bounce = self.ball_y <= r
+        self.vel_y[bounce] *= -1
+
+        # Ball hit the left or right side: back to the middle with a random new angle
+        out = (self.ball_x <= r) | (self.ball_x >= self.width - r)
+        for idx in np.flatnonzero(out):
+            self._serve(idx)
+
+        self.ball_x += self.vel_x
+        self.ball_y += self.vel_y
+
+    def _serve(self, idx):
+        # Scalar port of the reset branch in Pong.move, rare enough to leave unvectorized
+        rng = self.rngs[idx]
+        vel_x, vel_y = self.vel_x[idx], self.vel_y[idx]
+        self.ball_x[idx] = self.width/2-self.radius
+
+        random_direction = rng.choice([0,1])
+        random_angle = rng.choice([0,1,2])
+
+        if random_direction == 0:
+            vel_x = -vel_x
+        if random_angle == 0:
+            vel_y = vel_y-1
+        if random_angle == 2:
+            vel_x = vel_x-1
+
+        self.vel_x[idx], self.vel_y[idx] = -vel_x, -vel_y
+
+    def step(self, actions, opponent_actions=None):
+        # Advance every game by one frame; actions is an int array of shape (n_games,),
+        # opponent_actions the same for the right paddles (None leaves them still)
+        actions = np.asarray(actions)
+        self.frame_iteration += 1
+
+        # Game.handle_movement
+        self._handle_collisions()
+        self._move_paddles()
+        self._move_ball()
+
+        # Game._move: the new velocity takes effect on the next frame
+        self.left_paddle_vel[:] = ACTION_VELOCITY[actions]
+        if opponent_actions is not None:
+            self.right_paddle_vel[:] = ACTION_VELOCITY[np.asarray(opponent_actions)]
+
+        # Ball passed the left paddle: game over
+        dones = self.ball_x <= self.radius
+        self.player_score[dones] += 1
+
+        # Ball passed the opponent's paddle
+        scored = ~dones & (self.ball_x >= self.width - self.radius)
+        self.ai_score[scored] += 1
+
+        rewards = np.zeros(self.n_games, dtype=np.int64)
+        rewards[scored] = 10
+        rewards[dones] = -10
+
+        # Scores and terminal states are taken before finished games are reset;
+        # terminal_states is states itself when no game finished
+        states = terminal_states = self.get_states()
+        scores = self.ai_score.copy()
+        if dones.any():
+            terminal_states = states.copy()
+            self._reset(dones)
+            self._refresh_states(states, dones)
+
+        return states, terminal_states, rewards, dones, scores